@@ -0,0 +1,38 @@
+"""
+Micro benchmarks for the hot paths of the API.
+
+Run them from the project directory, e.g. ``python -m benchmarks.combination_lookup``.
+Benchmarks that need a database create a throwaway test database on the configured
+backend, so the development data is never touched.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vocabTrainer.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Create a fresh test database for the duration of the block."""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def timed(function, repeat):
+    """Return the mean wall time of function in microseconds."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
@@ -0,0 +1,87 @@
+"""
+Duplicate check for a word pair with 1M combinations in the table.
+
+Compares the old OR filter over both orientations with the single equality probe
+on the (word1, word2) unique index that the canonical ordering allows.
+
+    python -m benchmarks.combination_lookup [--combinations 1000000]
+"""
+import argparse
+import math
+import random
+
+from . import setup, test_database, timed
+
+
+def populate(connection, total):
+    from dictionary.models import DictionaryEntry, WordCombination
+
+    size = math.ceil((1 + math.sqrt(1 + 8 * total)) / 2)
+    DictionaryEntry.objects.bulk_create(
+        [DictionaryEntry(language='en' if i % 2 else 'de', word=f'word{i}') for i in range(size)],
+        batch_size=5000
+    )
+    ids = list(DictionaryEntry.objects.order_by('id').values_list('id', flat=True))
+
+    def pairs():
+        count = 0
+        for i, word1_id in enumerate(ids):
+            for word2_id in ids[i + 1:]:
+                if count == total:
+                    return
+                yield WordCombination(word1_id=word1_id, word2_id=word2_id)
+                count += 1
+
+    batch = []
+    for combination in pairs():
+        batch.append(combination)
+        if len(batch) == 20000:
+            WordCombination.objects.bulk_create(batch)
+            batch = []
+    WordCombination.objects.bulk_create(batch)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {WordCombination._meta.db_table}')
+
+    return ids
+
+
+def explain(queryset):
+    return queryset.explain().replace('\n', '\n    ')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--combinations', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.db.models import Q
+    from dictionary.models import WordCombination
+
+    with test_database() as connection:
+        ids = populate(connection, args.combinations)
+        print(f'{WordCombination.objects.count()} combinations on {connection.vendor}')
+
+        rng = random.Random(0)
+        samples = [sorted(rng.sample(ids, 2)) for _ in range(args.repeat)]
+
+        def or_filter(word1_id, word2_id):
+            return WordCombination.objects.filter(
+                (Q(word1_id=word1_id) & Q(word2_id=word2_id)) | (Q(word1_id=word2_id) & Q(word2_id=word1_id))
+            )
+
+        def canonical(word1_id, word2_id):
+            return WordCombination.objects.filter(word1_id=word1_id, word2_id=word2_id)
+
+        for name, build in (('OR filter', or_filter), ('canonical', canonical)):
+            pending = iter(samples)
+            mean = timed(lambda: build(*next(pending)).first(), args.repeat)
+            print(f'{name:>10}: {mean:8.1f} us per lookup')
+            print(f'    {explain(build(*samples[0]))}')
+
+
+if __name__ == '__main__':
+    main()
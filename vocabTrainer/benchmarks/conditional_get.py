@@ -0,0 +1,63 @@
+"""
+Bytes sent and server time of a poll for unchanged data, full response versus 304 Not Modified.
+
+    python -m benchmarks.conditional_get [--combinations 100] [--repeat 200]
+"""
+import argparse
+import time
+
+from . import setup, test_database
+
+
+def measure(client, url, params, repeat, **headers):
+    """Return the mean wall and CPU time in milliseconds and the body size of the last response."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        response = client.get(url, params, **headers)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return wall / repeat * 1e3, cpu / repeat * 1e3, len(response.content), response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--combinations', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from collection.models import Collection
+    from dictionary.models import DictionaryEntry, WordCombination
+
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='bench')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+        collection = Collection.objects.create(name='Bench', creator='bench', language_combination='en-de')
+        for i in range(args.combinations):
+            collection.word_combinations.add(WordCombination.objects.create(
+                word1=DictionaryEntry.objects.create(word=f'word{i}', language='en'),
+                word2=DictionaryEntry.objects.create(word=f'Wort{i}', language='de')
+            ))
+
+        url = reverse('collection_detail', args=[collection.id])
+        params = {'page_size': args.combinations}
+
+        full_wall, full_cpu, full_size, response = measure(client, url, params, args.repeat)
+        etag = response['ETag']
+        cond_wall, cond_cpu, cond_size, response = measure(client, url, params, args.repeat, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        print(f'collection with {args.combinations} combinations, {args.repeat} polls each')
+        print(f'{"":>8} {"body":>10} {"wall":>10} {"cpu":>10}')
+        print(f'{"200":>8} {full_size:>8} B {full_wall:>7.2f}ms {full_cpu:>7.2f}ms')
+        print(f'{"304":>8} {cond_size:>8} B {cond_wall:>7.2f}ms {cond_cpu:>7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
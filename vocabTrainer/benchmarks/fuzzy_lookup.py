@@ -0,0 +1,57 @@
+"""
+Latency of typo tolerant lookups against dictionary size, sorted-array automaton versus a linear scan.
+
+    python -m benchmarks.fuzzy_lookup [--sizes 10000 100000 300000 1000000]
+"""
+import argparse
+import random
+import string
+
+from . import setup, timed
+
+
+def misspell(rng, word):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 300_000, 1_000_000])
+    parser.add_argument('--max-distance', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--skip-scan-above', type=int, default=300_000)
+    args = parser.parse_args()
+
+    setup()
+    from dictionary.fuzzy import fuzzy_search, levenshtein
+
+    rng = random.Random(0)
+    print(f'{"words":>9} {"automaton":>10} {"linear scan":>12}', flush=True)
+    for size in args.sizes:
+        words = sorted({
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+            for _ in range(size)
+        })
+        ids = list(range(len(words)))
+        queries = [misspell(rng, word) for word in rng.sample(words, args.repeat)]
+
+        pending = iter(queries)
+        automaton = timed(lambda: fuzzy_search(words, ids, next(pending), args.max_distance, 10), args.repeat)
+
+        def scan(query):
+            return sorted(
+                (distance, word) for word in words
+                if (distance := levenshtein(query, word, args.max_distance)) <= args.max_distance
+            )[:10]
+
+        scan_latency = '-'
+        if size <= args.skip_scan_above:
+            pending = iter(queries)
+            scan_latency = f'{timed(lambda: scan(next(pending)), args.repeat) / 1000:.1f}ms'
+
+        print(f'{len(words):>9,} {automaton / 1000:>8.1f}ms {scan_latency:>12}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Memory and lookup latency of the in-process prefix index.
+
+    python -m benchmarks.prefix_index [--words 1000000]
+"""
+import argparse
+import random
+import string
+import sys
+
+from . import setup, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=100_000)
+    args = parser.parse_args()
+
+    setup()
+    from dictionary.search import PrefixIndex
+
+    rng = random.Random(0)
+    words = {
+        ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+        for _ in range(args.words)
+    }
+    pairs = [(word, entry_id) for entry_id, word in enumerate(words, start=1)]
+    del words
+
+    index = PrefixIndex((word, word, entry_id) for word, entry_id in pairs)
+
+    strings = sum(sys.getsizeof(word) for word in index.words)
+    word_list = sys.getsizeof(index.words)
+    key_list = sys.getsizeof(index.keys)
+    ids = sys.getsizeof(index.ids)
+    print(f'{len(index)} words: {(strings + word_list + key_list + ids) / 2**20:.1f} MB')
+    print(f'  word strings {strings / 2**20:.1f} MB, word list {word_list / 2**20:.1f} MB, '
+          f'key list {key_list / 2**20:.1f} MB, id array {ids / 2**20:.1f} MB')
+
+    prefixes = [word[:3] for word, _ in rng.sample(pairs, 1000)]
+    pending = iter(prefixes * (args.repeat // len(prefixes) + 1))
+    print(f'search: {timed(lambda: index.search(next(pending), 10), args.repeat):.1f} us per lookup')
+
+    pending = iter((word + '~', entry_id) for word, entry_id in rng.sample(pairs, 1000))
+    print(f'add:    {timed(lambda: index.add(*next(pending)), 1000):.1f} us per insert')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Serialization time of a page of collections with images, a JWT per row versus signed URLs.
+
+    python -m benchmarks.signed_urls [--collections 100] [--repeat 50]
+"""
+import argparse
+
+from . import setup, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--collections', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from unittest import mock
+
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from collection import serializers
+    from collection.models import Collection
+
+    def add_token_url(representation, instance, request):
+        """The previous implementation, an access token per row."""
+        if instance.image and request:
+            token = AccessToken.for_user(request.user)
+            secure_image_url = request.build_absolute_uri(
+                reverse('secure_image', kwargs={'image_path': instance.image.name})
+            )
+            representation['image'] = f'{secure_image_url}?token={token}'
+        return representation
+
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='bench')
+        Collection.objects.bulk_create([
+            Collection(name=f'Collection {i}', creator='bench', language_combination='en-de', image=f'collections/{i}.png')
+            for i in range(args.collections)
+        ])
+        page = list(Collection.objects.order_by('id'))
+
+        def serialize():
+            # A new request each time, like a new response.
+            request = Request(APIRequestFactory().get('/api/collection/'))
+            request.user = user
+            return serializers.CollectionSerializer(page, many=True, context={'request': request}).data
+
+        signed = timed(serialize, args.repeat)
+        with mock.patch.object(serializers, '_add_secure_image_url', add_token_url):
+            tokens = timed(serialize, args.repeat)
+
+        print(f'{args.collections} collections with images, mean of {args.repeat} serializations')
+        print(f'{"jwt per row":>14} {tokens / 1e3:>8.2f}ms')
+        print(f'{"signed urls":>14} {signed / 1e3:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Build time, memory and lookup latency of the in-process translation graph.
+
+    python -m benchmarks.translation_graph [--entries 500000] [--combinations 1000000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from . import setup, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=500_000)
+    parser.add_argument('--combinations', type=int, default=1_000_000)
+    parser.add_argument('--languages', nargs='+', default=['en', 'de', 'fr', 'es', 'it'])
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    from dictionary.graph import TranslationGraph
+
+    rng = random.Random(0)
+    nodes = [(entry_id, rng.choice(args.languages)) for entry_id in range(1, args.entries + 1)]
+    edges = {
+        tuple(sorted(rng.sample(range(1, args.entries + 1), 2)))
+        for _ in range(args.combinations)
+    }
+
+    started = time.perf_counter()
+    graph = TranslationGraph(nodes, edges)
+    print(f'{args.entries} entries, {len(edges)} combinations: built in {time.perf_counter() - started:.1f}s')
+
+    arrays = sum(sys.getsizeof(values) for values in (graph.node_ids, graph.node_languages, graph.offsets, graph.neighbors))
+    print(f'  arrays {arrays / 2**20:.1f} MB')
+
+    starts = iter(rng.choices(range(1, args.entries + 1), k=args.repeat * 2))
+    for max_hops in (1, 2):
+        latency = timed(lambda: graph.translate([next(starts)], 'fr', max_hops), args.repeat)
+        print(f'translate, max_hops={max_hops}: {latency:.1f} us per lookup')
+
+    pending = iter(rng.sample(range(1, args.entries + 1), 2000))
+    print(f'add:     {timed(lambda: graph.add(next(pending), "en", next(pending), "fr"), 1000):.1f} us per combination')
+
+    started = time.perf_counter()
+    graph.compacted(graph.overlay())
+    print(f'compact: {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
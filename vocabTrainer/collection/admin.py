@@ -4,7 +4,7 @@ from django.template.loader import render_to_string
 from django.utils.safestring import mark_safe
 from .models import Collection, CollectionCombination
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken
+from vocabTrainer.signing import MediaSigner, media_expiry
 from django.urls import reverse
 
 User = get_user_model()
@@ -90,10 +90,9 @@ class CollectionForm(forms.ModelForm):
 
         if self.instance and self.instance.image:
             secure_url = reverse('secure_image', args=[self.instance.image])
-            token = AccessToken.for_user(user) if user else None
 
-            if secure_url and token:
-                secure_image_url = f"{secure_url}?token={token}"
+            if secure_url and user:
+                secure_image_url = f"{secure_url}?{MediaSigner(user.pk, media_expiry()).query(self.instance.image.name)}"
                 self.fields['image'].help_text = mark_safe(f'<img id="image-preview" src="{secure_image_url}" width="200" height="auto" alt="Current Image" />')
 
     def clean(self):
@@ -151,7 +150,7 @@ class CollectionCombinationForm(forms.ModelForm):
         """
         Fetch the word combinations related to this collection.
         """
-        word_combinations = self.instance.word_combinations.all()
+        word_combinations = self.instance.word_combinations.select_related('word1', 'word2')
         word_combinations_data = []
 
         for wc in word_combinations:
@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class CollectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'collection'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_save
+        from vocabTrainer.cache import connect_version_signals
+        from vocabTrainer.thumbnails import schedule_image_variants
+        from dictionary.signals import combinations_changed
+        from .changes import record_combination_changes, record_membership_changes
+        from .models import Collection
+        from .summaries import refresh_combination_summaries, refresh_membership_summaries
+        connect_version_signals(Collection)
+        combinations_changed.connect(record_combination_changes, dispatch_uid='collection-change-log')
+        combinations_changed.connect(refresh_combination_summaries, dispatch_uid='collection-summaries')
+        m2m_changed.connect(
+            refresh_membership_summaries, sender=Collection.word_combinations.through, dispatch_uid='collection-summaries'
+        )
+        m2m_changed.connect(
+            record_membership_changes, sender=Collection.word_combinations.through, dispatch_uid='collection-change-log'
+        )
+        post_save.connect(schedule_image_variants, sender=Collection, dispatch_uid='collection-image-variants')
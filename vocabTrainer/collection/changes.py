@@ -0,0 +1,166 @@
+"""
+Append-only change log of the word combinations in each collection, for delta sync.
+
+Every write that adds, updates or removes a word combination of a collection appends one row
+per collection with the combination id and whether it was deleted. The row id is the sequence
+number clients sync from: ``changes_since`` reads the rows after the client's sequence number
+with one range scan on (collection, id), folds several changes of a combination into the last
+one and loads the upserted combinations with one more query. A sync therefore costs the same
+for a collection of ten or of a million combinations, only the number of edits counts.
+A client that has nothing yet pages through the whole collection first, see ``collection_snapshot``.
+
+Besides the API serializers and import_vocab, which write without signals and call
+``record_changes`` themselves, ``record_membership_changes`` logs the changes made with
+``collection.word_combinations.add()``, ``remove()`` and ``clear()`` and their reverse.
+
+Writers lock the collection rows before appending, so on PostgreSQL the changes of a
+collection commit in the order of their ids and a reader never skips a row that commits later.
+"""
+from .models import Collection, CollectionChange
+from dictionary.models import WordCombination
+from dictionary.serializers import get_representation
+
+CHANGES_BATCH_SIZE = 500
+
+
+def record_changes(changes):
+    """
+    Append changes to the change logs of their collections.
+
+    Must run inside the transaction of the write.
+
+    Args:
+        changes (iterable): (collection_id, word_combination_id, deleted) tuples.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    collection_ids = sorted({collection_id for collection_id, _, _ in changes})
+    list(Collection.objects.select_for_update().filter(pk__in=collection_ids).order_by('id').values_list('id', flat=True))
+
+    CollectionChange.objects.bulk_create(
+        [
+            CollectionChange(collection_id=collection_id, word_combination_id=combination_id, deleted=deleted)
+            for collection_id, combination_id, deleted in changes
+        ],
+        batch_size=5000
+    )
+
+
+def record_combination_changes(sender, updated, deleted, **kwargs):
+    """Receiver of combinations_changed, logs the changes in every collection the combinations belong to."""
+    deleted = set(deleted)
+    memberships = Collection.word_combinations.through.objects.filter(
+        wordcombination_id__in=[*updated, *deleted]
+    ).values_list('collection_id', 'wordcombination_id')
+
+    record_changes(
+        (collection_id, combination_id, combination_id in deleted)
+        for collection_id, combination_id in memberships
+    )
+
+
+def record_membership_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Receiver of m2m_changed on the word combinations of collections."""
+    if action == 'pre_clear':
+        # The members are unknown once the links are gone.
+        column = 'wordcombination_id' if reverse else 'collection_id'
+        instance._cleared_members = list(
+            sender.objects.filter(**{column: instance.pk}).values_list('collection_id', 'wordcombination_id')
+        )
+        return
+
+    if action == 'post_clear':
+        record_changes(
+            (collection_id, combination_id, True)
+            for collection_id, combination_id in getattr(instance, '_cleared_members', [])
+        )
+    elif action in ('post_add', 'post_remove'):
+        deleted = action == 'post_remove'
+        if reverse:
+            record_changes((collection_id, instance.pk, deleted) for collection_id in pk_set)
+        else:
+            record_changes((instance.pk, combination_id, deleted) for combination_id in pk_set)
+
+
+def latest_sequence(collection_id):
+    return CollectionChange.objects.filter(collection_id=collection_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def collection_snapshot(collection_id, after=0, seq=None, limit=CHANGES_BATCH_SIZE):
+    """
+    Read a page of the whole collection, for a client that has nothing yet.
+
+    Pages follow the combination ids. The sequence number is read before the first page and
+    passed back with every following one, so once has_more is false the client continues with
+    changes_since from there and receives every change made while it was paging, some of them
+    twice, which is harmless as the upserts carry the current state.
+
+    Args:
+        collection_id (int): The collection.
+        after (int): The 'after' of the previous page, 0 for the first.
+        seq (int): The 'seq' of the previous page, None for the first.
+        limit (int): The maximum number of combinations to read.
+
+    Returns:
+        dict: Like changes_since, plus 'after' to pass with seq for the next page.
+    """
+    if seq is None:
+        seq = latest_sequence(collection_id)
+
+    combinations = list(
+        WordCombination.objects.filter(collections=collection_id, id__gt=after)
+        .select_related('word1', 'word2')
+        .order_by('id')[:limit + 1]
+    )
+    has_more = len(combinations) > limit
+    combinations = combinations[:limit]
+
+    return {
+        'seq': seq,
+        'has_more': has_more,
+        'after': combinations[-1].id if has_more else None,
+        'upserts': [get_representation(combination) for combination in combinations],
+        'deletes': [],
+    }
+
+
+def changes_since(collection_id, since, limit=CHANGES_BATCH_SIZE):
+    """
+    Collect the changes of a collection after a sequence number.
+
+    Args:
+        collection_id (int): The collection.
+        since (int): The last sequence number the client has applied.
+        limit (int): The maximum number of log rows to read.
+
+    Returns:
+        dict: 'seq' to pass as since next time, 'has_more' if another batch is waiting, the
+        'upserts' in the representation of the collection detail endpoint and the 'deletes' as ids.
+    """
+    combinations = WordCombination.objects.filter(collections=collection_id).select_related('word1', 'word2')
+
+    rows = list(
+        CollectionChange.objects.filter(collection_id=collection_id, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'word_combination_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    last_change = {}
+    for _, combination_id, deleted in rows:
+        last_change[combination_id] = deleted
+
+    # The current state is sent, a combination deleted by a later batch is already missing here.
+    upserts = combinations.filter(id__in=[key for key, deleted in last_change.items() if not deleted]).order_by('id')
+    upserts = [get_representation(combination) for combination in upserts]
+
+    sent = {item['id'] for item in upserts}
+    return {
+        'seq': rows[-1][0] if rows else since,
+        'has_more': has_more,
+        'upserts': upserts,
+        'deletes': sorted(key for key in last_change if key not in sent),
+    }
@@ -0,0 +1,180 @@
+"""
+Deletion of collections in the background.
+
+Deleting a collection only sets ``deleted_at``, which hides it from ``Collection.objects``, and
+records a ``CollectionDeletion`` job, a few short statements however large the collection is.
+The rows are reclaimed afterwards in chunks of one short transaction each:
+
+1. reclaiming: the links of the collection are deleted chunk by chunk, the word combinations
+   that were in no other collection are marked as orphaned first,
+2. the change log and the collection row are deleted,
+3. sweeping: the orphan sweeper deletes the orphaned combinations and unreferenced entries,
+   see ``dictionary.orphans``.
+
+The job carries the progress for the status endpoint. It is started in a background thread
+once the deletion commits, with ``COLLECTION_RECLAIM_IN_BACKGROUND`` off or after a restart
+the reclaim_collections management command finishes the open jobs.
+
+A worker claims a job with a conditional update and holds a lease on it, renewed after every
+chunk. Running jobs are only taken over once their lease ran out, ``COLLECTION_RECLAIM_LEASE``
+seconds after the last renewal, so a job never runs twice at the same time.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import Collection, CollectionChange, CollectionDeletion
+from dictionary.models import WordCombination
+from dictionary.orphans import sweep_orphans
+from vocabTrainer.cache import bump_table_versions
+
+logger = logging.getLogger(__name__)
+
+RECLAIM_CHUNK_SIZE = 5000
+
+
+def delete_collection(collection):
+    """
+    Hide a collection and record the job that reclaims its rows. Must run inside a transaction.
+
+    Args:
+        collection (Collection): The collection to delete.
+
+    Returns:
+        CollectionDeletion: The job.
+    """
+    collection.deleted_at = timezone.now()
+    collection.save(update_fields=['deleted_at'])
+
+    total = Collection.word_combinations.through.objects.filter(collection_id=collection.id).count()
+    deletion = CollectionDeletion.objects.create(collection_id=collection.id, total=total)
+
+    if getattr(settings, 'COLLECTION_RECLAIM_IN_BACKGROUND', True):
+        transaction.on_commit(start_reclaimer)
+    return deletion
+
+
+def _reclaim_chunk(collection_id, chunk_size):
+    """Delete up to chunk_size links of a deleted collection and return how many were deleted."""
+    through = Collection.word_combinations.through
+
+    with transaction.atomic():
+        ids = list(
+            through.objects.filter(collection_id=collection_id).values_list('wordcombination_id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+
+        other_collections = through.objects.filter(wordcombination_id=OuterRef('pk')).exclude(collection_id=collection_id)
+        WordCombination.objects.filter(id__in=ids).exclude(Exists(other_collections)).update(orphaned_at=timezone.now())
+
+        deleted, _ = through.objects.filter(collection_id=collection_id, wordcombination_id__in=ids).delete()
+        CollectionDeletion.objects.filter(collection_id=collection_id).update(reclaimed=F('reclaimed') + deleted)
+        # Deleted without m2m_changed
+        bump_table_versions(through)
+
+    return len(ids)
+
+
+def _delete_change_log(collection_id, chunk_size):
+    while True:
+        with transaction.atomic():
+            ids = list(CollectionChange.objects.filter(collection_id=collection_id).values_list('id', flat=True)[:chunk_size])
+            CollectionChange.objects.filter(id__in=ids).delete()
+        if len(ids) < chunk_size:
+            break
+
+
+def _lease():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'COLLECTION_RECLAIM_LEASE', 600))
+
+
+def reclaim_collection(deletion, chunk_size=RECLAIM_CHUNK_SIZE):
+    """
+    Run a claimed deletion job to the end, one short transaction per chunk.
+
+    Args:
+        deletion (CollectionDeletion): The job, claimed by reclaim_collections.
+        chunk_size (int): The number of rows deleted per transaction.
+    """
+    collection_id = deletion.collection_id
+    jobs = CollectionDeletion.objects.filter(pk=deletion.pk)
+
+    try:
+        while _reclaim_chunk(collection_id, chunk_size) == chunk_size:
+            jobs.update(leased_until=_lease())
+
+        _delete_change_log(collection_id, chunk_size)
+        with transaction.atomic():
+            Collection.all_objects.filter(pk=collection_id).delete()
+
+        jobs.update(status=CollectionDeletion.SWEEPING, leased_until=_lease())
+        swept = sweep_orphans(chunk_size)
+
+        jobs.update(
+            status=CollectionDeletion.DONE,
+            deleted_combinations=swept['combinations'],
+            deleted_entries=swept['entries'],
+            finished_at=timezone.now()
+        )
+        logger.info(f'Reclaimed deleted collection with id {collection_id}')
+    except Exception:
+        jobs.update(status=CollectionDeletion.FAILED, finished_at=timezone.now())
+        logger.exception(f'Reclaiming deleted collection with id {collection_id} failed')
+
+
+def reclaim_collections(statuses=(CollectionDeletion.PENDING,), chunk_size=RECLAIM_CHUNK_SIZE):
+    """
+    Run the deletion jobs in the given states, oldest first. Jobs reclaiming or sweeping are
+    only run once their lease ran out.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    running = {CollectionDeletion.RECLAIMING, CollectionDeletion.SWEEPING}
+    count = 0
+    last_id = 0
+    while True:
+        claimable = (
+            Q(status__in=[status for status in statuses if status not in running])
+            | Q(status__in=[status for status in statuses if status in running], leased_until__lt=timezone.now())
+        )
+        deletion = CollectionDeletion.objects.filter(claimable, id__gt=last_id).order_by('id').first()
+        if deletion is None:
+            return count
+        last_id = deletion.id
+
+        # Claimed with a conditional update, so two workers never run the same job.
+        claimed = CollectionDeletion.objects.filter(claimable, pk=deletion.pk, status=deletion.status).update(
+            status=CollectionDeletion.RECLAIMING, leased_until=_lease()
+        )
+        if claimed:
+            reclaim_collection(deletion, chunk_size)
+            count += 1
+
+
+_reclaimer = None
+_reclaimer_lock = threading.Lock()
+
+
+def _run_reclaimer():
+    try:
+        reclaim_collections()
+    finally:
+        close_old_connections()
+
+
+def start_reclaimer():
+    """Start the background thread that runs the pending deletion jobs, unless it is running."""
+    global _reclaimer
+
+    with _reclaimer_lock:
+        if _reclaimer is not None and _reclaimer.is_alive():
+            return
+        _reclaimer = threading.Thread(target=_run_reclaimer, name='collection-reclaimer', daemon=True)
+        _reclaimer.start()
@@ -0,0 +1,260 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from collection.changes import record_changes
+from collection.models import Collection
+from collection.summaries import refresh_summaries
+from dictionary.models import SEARCH_KEY_LENGTH, DictionaryEntry, WordCombination, search_key
+from dictionary.serializers import _bulk_create_combinations, _clean_words
+from vocabTrainer.cache import bump_table_versions
+
+FORMATS = {
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+STAGING_TABLE = 'import_vocab_staging'
+
+
+def read_rows(path, file_format):
+    """
+    Yield one language-keyed words dict per row of the file, e.g. {'en': 'house', 'de': 'Haus'}.
+
+    CSV/TSV files need a header with the columns language1, word1, language2 and word2.
+    JSONL files hold one object per line in the same shape the API returns, an optional
+    'id' key is ignored.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'jsonl':
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield None
+                    continue
+                if isinstance(row, dict):
+                    row.pop('id', None)
+                yield row
+            return
+
+        reader = csv.DictReader(file, delimiter='\t' if file_format == 'tsv' else ',')
+        missing = {'language1', 'word1', 'language2', 'word2'} - set(reader.fieldnames or [])
+        if missing:
+            raise CommandError(f'Missing columns: {", ".join(sorted(missing))}')
+
+        for row in reader:
+            yield {row['language1']: row['word1'], row['language2']: row['word2']}
+
+
+def chunked(rows, size):
+    """Yield lists of at most size rows without materializing the whole input."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class BulkCreateLoader:
+    """Loads chunks through the set-based helpers used by the API, works on every backend."""
+
+    def __init__(self, collection=None):
+        self.collection = collection
+
+    def load(self, chunk):
+        # Chunks are bounded by --chunk-size, not by the limit of the API.
+        result = _bulk_create_combinations([{'words': words} for words in chunk], limit=None)
+
+        if self.collection is not None:
+            through = Collection.word_combinations.through
+            combination_ids = [item['id'] for item in result['created'] + result['existing']]
+            through.objects.bulk_create(
+                [
+                    through(collection_id=self.collection.id, wordcombination_id=combination_id)
+                    for combination_id in combination_ids
+                ],
+                ignore_conflicts=True
+            )
+            # Rows that were already linked are logged again, applying an upsert twice is harmless.
+            record_changes((self.collection.id, combination_id, False) for combination_id in combination_ids)
+            bump_table_versions(through)
+
+        return len(result['created'])
+
+    def close(self):
+        pass
+
+
+class PostgresCopyLoader:
+    """Streams chunks with COPY into a temporary staging table and merges them with set-based SQL."""
+
+    def __init__(self, collection=None):
+        self.collection = collection
+        self.entry_table = DictionaryEntry._meta.db_table
+        self.combination_table = WordCombination._meta.db_table
+        self.through_table = Collection.word_combinations.through._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+                    language1 varchar(50), word1 varchar(100), key1 varchar({SEARCH_KEY_LENGTH}),
+                    language2 varchar(50), word2 varchar(100), key2 varchar({SEARCH_KEY_LENGTH})
+                )
+            """)
+
+    def copy(self, cursor, chunk):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for words in chunk:
+            (language1, word1), (language2, word2) = words.items()
+            writer.writerow((language1, word1, search_key(word1), language2, word2, search_key(word2)))
+        buffer.seek(0)
+
+        sql = f'COPY {STAGING_TABLE} (language1, word1, key1, language2, word2, key2) FROM STDIN WITH (FORMAT csv)'
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            raw_cursor.copy_expert(sql, buffer)
+        else:
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    def load(self, chunk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+            self.copy(cursor, chunk)
+
+            # Only words whose search key is new get an entry, one spelling per key.
+            cursor.execute(f"""
+                INSERT INTO {self.entry_table} (language, word, search_key)
+                SELECT DISTINCT ON (s.language, s.key) s.language, s.word, s.key FROM (
+                    SELECT language1 AS language, word1 AS word, key1 AS key FROM {STAGING_TABLE}
+                    UNION SELECT language2, word2, key2 FROM {STAGING_TABLE}
+                ) s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {self.entry_table} e WHERE e.search_key = s.key AND e.language = s.language
+                )
+                ORDER BY s.language, s.key, s.word
+                ON CONFLICT (language, word) DO NOTHING
+            """)
+
+            cursor.execute(f"""
+                CREATE TEMP TABLE import_vocab_pairs AS
+                SELECT DISTINCT
+                    LEAST(e1.id, e2.id) AS word1_id,
+                    GREATEST(e1.id, e2.id) AS word2_id,
+                    CASE WHEN e1.language COLLATE "C" <= e2.language COLLATE "C"
+                        THEN e1.language || '-' || e2.language
+                        ELSE e2.language || '-' || e1.language
+                    END AS language_pair
+                FROM {STAGING_TABLE} s
+                JOIN LATERAL (
+                    SELECT id, language FROM {self.entry_table} e
+                    WHERE e.search_key = s.key1 AND e.language = s.language1
+                    ORDER BY e.word = s.word1 DESC, e.id LIMIT 1
+                ) e1 ON TRUE
+                JOIN LATERAL (
+                    SELECT id, language FROM {self.entry_table} e
+                    WHERE e.search_key = s.key2 AND e.language = s.language2
+                    ORDER BY e.word = s.word2 DESC, e.id LIMIT 1
+                ) e2 ON TRUE
+            """)
+
+            cursor.execute(f"""
+                INSERT INTO {self.combination_table} (word1_id, word2_id, language_pair)
+                SELECT p.word1_id, p.word2_id, p.language_pair FROM import_vocab_pairs p
+                ON CONFLICT (word1_id, word2_id) DO NOTHING
+            """)
+            created = cursor.rowcount
+
+            if self.collection is not None:
+                cursor.execute(f"""
+                    INSERT INTO {self.through_table} (collection_id, wordcombination_id)
+                    SELECT DISTINCT %s, c.id FROM import_vocab_pairs p
+                    JOIN {self.combination_table} c ON c.word1_id = p.word1_id AND c.word2_id = p.word2_id
+                    ON CONFLICT DO NOTHING
+                    RETURNING wordcombination_id
+                """, [self.collection.id])
+                record_changes((self.collection.id, row[0], False) for row in cursor.fetchall())
+
+            cursor.execute('DROP TABLE import_vocab_pairs')
+
+        bump_table_versions(DictionaryEntry, WordCombination, Collection.word_combinations.through)
+        return created
+
+    def close(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+
+
+class Command(BaseCommand):
+    help = 'Stream word combinations from a CSV, TSV or JSONL file into the dictionary.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=sorted(set(FORMATS.values())), help='Defaults to the file extension.')
+        parser.add_argument('--collection', type=int, help='ID of a collection the combinations are added to.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows committed per transaction.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'File {path} does not exist.')
+
+        file_format = options['format'] or FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format is None:
+            raise CommandError('Unknown file format, use --format.')
+
+        collection = None
+        if options['collection'] is not None:
+            try:
+                collection = Collection.objects.get(pk=options['collection'])
+            except Collection.DoesNotExist:
+                raise CommandError(f'Collection with id {options["collection"]} does not exist.')
+
+        loader_class = PostgresCopyLoader if connection.vendor == 'postgresql' else BulkCreateLoader
+        loader = loader_class(collection)
+
+        stats = {'rows': 0, 'invalid': 0, 'created': 0}
+
+        def valid_rows():
+            for line, row in enumerate(read_rows(path, file_format), start=1):
+                words, error = _clean_words(row)
+                if error:
+                    stats['invalid'] += 1
+                    if options['verbosity'] > 1:
+                        self.stderr.write(f'Skipping invalid row {line}')
+                    continue
+                yield words
+
+        started = time.monotonic()
+        try:
+            for chunk in chunked(valid_rows(), options['chunk_size']):
+                with transaction.atomic():
+                    stats['created'] += loader.load(chunk)
+                stats['rows'] += len(chunk)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{stats["rows"]} rows imported ({stats["rows"] / elapsed:.0f} rows/s)')
+        finally:
+            loader.close()
+
+        if collection is not None:
+            # Once for the whole import, recounting after every chunk would scan the collection each time.
+            with transaction.atomic():
+                refresh_summaries([collection.id])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats["rows"]} rows in {elapsed:.1f}s ({stats["rows"] / max(elapsed, 1e-9):.0f} rows/s): '
+            f'{stats["created"]} new combinations, {stats["invalid"]} invalid rows skipped.'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from collection.deletion import RECLAIM_CHUNK_SIZE, reclaim_collections
+from collection.models import CollectionDeletion
+
+
+class Command(BaseCommand):
+    help = 'Finish the deletion of collections whose rows were not reclaimed in the background.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=RECLAIM_CHUNK_SIZE, help='Rows deleted per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # Also resumes jobs interrupted by a restart, every step can run again.
+        count = reclaim_collections(
+            statuses=[status for status, _ in CollectionDeletion.STATUS_CHOICES if status != CollectionDeletion.DONE],
+            chunk_size=options['chunk_size']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reclaimed {count} deleted collections in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from collection.media import store_legacy_images, sweep_media
+
+
+class Command(BaseCommand):
+    help = 'Delete collection images no collection refers to, optionally moving old uploads into the content-addressed storage first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, help='Keep files modified less than this many seconds ago.')
+        parser.add_argument('--store-legacy', action='store_true', help='Move images uploaded before the content-addressed storage into it.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['store_legacy']:
+            moved = store_legacy_images()
+            self.stdout.write(f'Moved the images of {moved} collections into the content-addressed storage.')
+
+        deleted = sweep_media(options['grace'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted["files"]} unreferenced images ({deleted["bytes"] / 1024 / 1024:.1f} MB) '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,108 @@
+"""
+Reference counting of the collection images in the content-addressed storage.
+
+An image blob is referenced by every collection whose ``image`` names it, several collections
+share one blob when the same file was uploaded for each. The references are counted from the
+rows themselves, so nothing can drift: ``sweep_media`` deletes the files below the upload
+directory that no collection, deleted or not, refers to, and their resized variants.
+
+Files younger than ``MEDIA_SWEEP_GRACE`` seconds are kept, an upload is stored before the row
+that refers to it commits, and storing existing content again touches its file.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import Collection
+from vocabTrainer.cache import bump_table_versions
+from vocabTrainer.storage import is_content_addressed
+from vocabTrainer.thumbnails import delete_variants
+
+logger = logging.getLogger(__name__)
+
+
+def _storage():
+    return Collection._meta.get_field('image').storage
+
+
+def _upload_directory():
+    return Collection._meta.get_field('image').upload_to.strip('/')
+
+
+def image_references():
+    """
+    Count the references of every image.
+
+    Returns:
+        dict: The number of collections per image name.
+    """
+    references = {}
+    for name in Collection.all_objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True):
+        references[name] = references.get(name, 0) + 1
+    return references
+
+
+def store_legacy_images():
+    """
+    Move the images stored before the content-addressed storage into it, duplicates become one blob.
+
+    The old files stay until sweep_media deletes them.
+
+    Returns:
+        int: The number of collections whose image was moved.
+    """
+    storage = _storage()
+    count = 0
+    for collection_id, name in Collection.all_objects.exclude(image='').exclude(image__isnull=True).values_list('id', 'image'):
+        if is_content_addressed(name) or not storage.exists(name):
+            continue
+
+        with storage.open(name) as file:
+            new_name = storage.save(name, File(file))
+
+        with transaction.atomic():
+            Collection.all_objects.filter(pk=collection_id, image=name).update(image=new_name)
+            # Updated without signals
+            bump_table_versions(Collection)
+        count += 1
+
+    return count
+
+
+def sweep_media(grace=None):
+    """
+    Delete the images no collection refers to.
+
+    Args:
+        grace (int): Keep files modified less than this many seconds ago, MEDIA_SWEEP_GRACE if None.
+
+    Returns:
+        dict: The number of 'files' deleted and the 'bytes' freed.
+    """
+    grace = getattr(settings, 'MEDIA_SWEEP_GRACE', 3600) if grace is None else grace
+    storage = _storage()
+    root = storage.path(_upload_directory())
+    cutoff = time.time() - grace
+    references = image_references()
+
+    deleted = {'files': 0, 'bytes': 0}
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+
+            stat = os.stat(path)
+            if name in references or stat.st_mtime > cutoff:
+                continue
+
+            os.remove(path)
+            delete_variants(name)
+            deleted['files'] += 1
+            deleted['bytes'] += stat.st_size
+
+    logger.info(f'Swept {deleted["files"]} unreferenced images, {deleted["bytes"]} bytes')
+    return deleted
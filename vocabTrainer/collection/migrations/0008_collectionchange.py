@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0007_delete_collectioncombinations_collectioncombination'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word_combination_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('collection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='collection.collection')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['collection', 'id'], name='collection_change_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:03
+
+from django.db import migrations, models
+
+PREVIEW_SIZE = 3
+
+
+def backfill_summaries(apps, schema_editor):
+    """Fill word_count and preview of the existing collections, like collection.summaries does."""
+    Collection = apps.get_model('collection', 'Collection')
+    WordCombination = apps.get_model('dictionary', 'WordCombination')
+
+    for collection in Collection.objects.annotate(count=models.Count('word_combinations')).iterator():
+        combinations = WordCombination.objects.filter(collections=collection.id).select_related('word1', 'word2')
+        collection.word_count = collection.count
+        collection.preview = [
+            {'id': item.id, item.word1.language: item.word1.word, item.word2.language: item.word2.word}
+            for item in combinations.order_by('id')[:PREVIEW_SIZE]
+        ]
+        collection.save(update_fields=['word_count', 'preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0009_collection_deleted_at_collectiondeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='preview',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='collection',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:12
+
+import vocabTrainer.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0010_collection_word_count_preview'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='collection',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=vocabTrainer.storage.content_addressed_storage, upload_to='collections/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0011_collection_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectiondeletion',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,14 +1,66 @@
 from django.db import models
 from dictionary.models import WordCombination
+from vocabTrainer.storage import content_addressed_storage
+
+class CollectionManager(models.Manager):
+    """Hides the collections that are deleted and wait for their rows to be reclaimed."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 class Collection(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     word_combinations = models.ManyToManyField(WordCombination, related_name='collections', blank=True)
     creator = models.CharField(max_length=50)
-    image = models.ImageField(upload_to='collections/', blank=True, null=True)
+    image = models.ImageField(upload_to='collections/', storage=content_addressed_storage, blank=True, null=True)
     language_combination = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
+    # Maintained by collection.summaries, so lists of collections need no joins.
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    preview = models.JSONField(default=list, editable=False)
+
+    objects = CollectionManager()
+    all_objects = models.Manager()
 
 class CollectionCombination(Collection):
     class Meta:
-        proxy = True
\ No newline at end of file
+        proxy = True
+
+class CollectionChange(models.Model):
+    collection = models.ForeignKey(Collection, related_name='changes', on_delete=models.CASCADE)
+    # No foreign key, deletions are kept after the combination is gone.
+    word_combination_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['collection', 'id'], name='collection_change_seq_idx')
+        ]
+
+class CollectionDeletion(models.Model):
+    PENDING = 'pending'
+    RECLAIMING = 'reclaiming'
+    SWEEPING = 'sweeping'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RECLAIMING, 'Reclaiming'),
+        (SWEEPING, 'Sweeping'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    # No foreign key, the job outlives the collection row.
+    collection_id = models.BigIntegerField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total = models.PositiveIntegerField(default=0)
+    reclaimed = models.PositiveIntegerField(default=0)
+    deleted_combinations = models.PositiveIntegerField(default=0)
+    deleted_entries = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Renewed by the worker running the job, a running job whose lease ran out was abandoned.
+    leased_until = models.DateTimeField(blank=True, null=True)
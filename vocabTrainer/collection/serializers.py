@@ -1,37 +1,92 @@
 from django.db import transaction, IntegrityError
-from django.urls import reverse
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from rest_framework import serializers
-import copy
-
-from rest_framework_simplejwt.tokens import AccessToken
 
+from .changes import record_changes
+from .deletion import delete_collection
 from .exceptions import WordCombinationAlreadyExistsException
-from .models import Collection
+from .models import Collection, CollectionDeletion
+from .summaries import refresh_summaries
+from dictionary.exceptions import WordCombinationFormatException
 from dictionary.serializers import (
-    _create_combination,
+    _bulk_create_combinations,
+    _check_words,
     WordCombinationSerializer,
     _delete_combination,
+    _split_ids,
     _update_combination,
     WordCombination
 )
+from vocabTrainer.cache import bump_table_versions
+from vocabTrainer.signing import media_signer
+
+# Lists show the image as a small card, they get a resized variant instead of the original.
+LIST_IMAGE_WIDTH = 256
+
+def _mark_orphaned_combinations(collection, combination_ids=None):
+    """
+    Mark the word combinations that are linked to no other collection than this one as orphaned,
+    with a single update. The orphan sweeper deletes them once they are unlinked.
 
-def _cleanup_word_combination(old_entry):
+    Args:
+        collection (Collection): The collection the combinations are removed from.
+        combination_ids (list): Only consider these combinations, all of the collection if None.
     """
-    Delete the word combination if it is no longer linked to any collections.
+    through = Collection.word_combinations.through
+    other_collections = through.objects.filter(wordcombination_id=OuterRef('pk')).exclude(collection_id=collection.id)
+
+    queryset = WordCombination.objects.filter(collections=collection)
+    if combination_ids is not None:
+        queryset = queryset.filter(id__in=combination_ids)
+
+    queryset.exclude(Exists(other_collections)).update(orphaned_at=timezone.now())
+
+@transaction.atomic
+def _bulk_remove_combinations(collection, values):
     """
-    if old_entry and old_entry.collections.count() == 1:
-        _delete_combination(old_entry)
+    Remove many word combinations from a collection with a fixed number of statements.
+
+    Unlike the removal of a single combination, the combinations themselves stay in the dictionary.
+    Those left in no collection are marked as orphaned, like the combinations of a deleted collection.
 
-def _add_secure_image_url(representation, instance, request):
+    Args:
+        collection (Collection): The collection to remove the combinations from.
+        values (list): The ids of the word combinations to remove.
+
+    Returns:
+        dict: The 'deleted' and 'not_found' ids and the 'invalid' items tagged with their index.
+    """
+    ids, invalid = _split_ids(values)
+
+    links = Collection.word_combinations.through.objects.filter(collection_id=collection.id, wordcombination_id__in=ids)
+    found = set(links.values_list('wordcombination_id', flat=True))
+    result = {
+        'deleted': [combination_id for combination_id in ids if combination_id in found],
+        'not_found': [combination_id for combination_id in ids if combination_id not in found],
+        'invalid': invalid,
+    }
+    if not found:
+        return result
+
+    _mark_orphaned_combinations(collection, result['deleted'])
+    links.delete()
+    # Deleted without m2m_changed
+    bump_table_versions(Collection.word_combinations.through)
+
+    record_changes((collection.id, combination_id, True) for combination_id in result['deleted'])
+    refresh_summaries([collection.id])
+    return result
+
+def _add_secure_image_url(representation, instance, request, width=None):
     """
-    Adds the secure image URL to the representation if the image exists.
+    Adds the signed image URL to the representation if the image exists. The signing key is
+    derived once per request, see vocabTrainer.signing. With a width the URL asks for the
+    nearest resized variant instead of the original, see vocabTrainer.thumbnails.
     """
     if instance.image and request:
-        token = AccessToken.for_user(request.user)
-        secure_image_url = request.build_absolute_uri(
-            reverse('secure_image', kwargs={'image_path': instance.image.name})
-        )
-        representation['image'] = f'{secure_image_url}?token={token}'
+        url = media_signer(request).url(instance.image.name)
+        representation['image'] = f'{url}&w={width}' if width else url
     return representation
 
 class CollectionSerializer(serializers.ModelSerializer):
@@ -39,7 +94,8 @@ class CollectionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Collection
-        fields = ["id", "name", "description", "creator", "image", "language_combination"]
+        fields = ["id", "name", "description", "creator", "image", "language_combination", "word_count", "preview"]
+        read_only_fields = ["word_count", "preview"]
 
     def create(self, validated_data):
         """
@@ -69,7 +125,7 @@ class CollectionSerializer(serializers.ModelSerializer):
         """
         representation = super().to_representation(instance)
         request = self.context.get('request')
-        return _add_secure_image_url(representation, instance, request)
+        return _add_secure_image_url(representation, instance, request, LIST_IMAGE_WIDTH)
 
 class CollectionDetailSerializer(serializers.ModelSerializer):
     word_combinations = serializers.ListField(
@@ -84,30 +140,58 @@ class CollectionDetailSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def create(self, validated_data):
         """
-        Create a collection and associate word combinations with it.
+        Add word combinations to a collection, creating those that do not exist yet.
+
+        Runs a fixed number of queries however many combinations are posted: the entries and
+        combinations are resolved by _bulk_create_combinations, the existing memberships are
+        read with one query and the new ones inserted with one bulk_create.
 
         Args:
-            validated_data: The validated data for collection creation.
+            validated_data: The validated data with the word combinations to add.
 
         Returns:
-            list: A list of word combinations that were added to the collection.
+            list: The posted word combinations in posted order, without repetitions.
 
         Raises:
-            WordCombinationAlreadyExistsException: If the word combination already exists in the collection.
+            WordCombinationFormatException: If a word combination is malformed.
+            WordCombinationAlreadyExistsException: If a word combination is already part of the
+                collection or posted twice, unless the on_conflict context is 'ignore'.
         """
         collection = self.context['collection']
+        ignore_existing = self.context.get('on_conflict') == 'ignore'
 
-        word_combinations = []
-        for item in validated_data.pop('word_combinations'):
-            combination = _create_combination(item, ignore_existing=True)
+        result = _bulk_create_combinations(validated_data.pop('word_combinations'))
+        if result['invalid']:
+            raise WordCombinationFormatException(result['invalid'][0]['detail'])
 
-            if collection.word_combinations.filter(id=combination.id).exists():
-                raise WordCombinationAlreadyExistsException(combination_id=combination.id)
+        ids = [item['id'] for item in sorted(result['created'] + result['existing'], key=lambda item: item['index'])]
+
+        through = Collection.word_combinations.through
+        members = set(
+            through.objects.filter(collection_id=collection.id, wordcombination_id__in=ids)
+            .values_list('wordcombination_id', flat=True)
+        )
 
-            collection.word_combinations.add(combination)
-            word_combinations.append(combination)
+        if not ignore_existing:
+            seen = set()
+            for combination_id in ids:
+                if combination_id in members or combination_id in seen:
+                    raise WordCombinationAlreadyExistsException(combination_id=combination_id)
+                seen.add(combination_id)
+
+        new_ids = [combination_id for combination_id in dict.fromkeys(ids) if combination_id not in members]
+        through.objects.bulk_create(
+            [through(collection_id=collection.id, wordcombination_id=combination_id) for combination_id in new_ids],
+            ignore_conflicts=True
+        )
+        # Inserted without m2m_changed
+        bump_table_versions(through)
+        record_changes((collection.id, combination_id, False) for combination_id in new_ids)
+        if new_ids:
+            refresh_summaries([collection.id])
 
-        return word_combinations
+        combinations = WordCombination.objects.select_related('word1', 'word2').in_bulk(ids)
+        return [combinations[combination_id] for combination_id in dict.fromkeys(ids)]
 
     @transaction.atomic
     def update(self, instance, validated_data):
@@ -131,25 +215,19 @@ class CollectionDetailSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+    @transaction.atomic
     def delete(self, instance):
         """
-        Delete a collection and its linked word combinations if they are not linked to other combinations.
+        Delete a collection. It is hidden at once, its links, orphaned word combinations and
+        unreferenced entries are reclaimed in chunks in the background, see collection.deletion.
 
         Args:
             instance (Collection): The collection instance to delete.
 
-        Raises:
-            IntegrityError: If there is a database integrity issue during the delete operation.
+        Returns:
+            CollectionDeletion: The job reclaiming the rows of the collection.
         """
-        word_combinations = instance.word_combinations.all()
-
-        try:
-            instance.delete()
-
-            for word_combination in word_combinations:
-                _cleanup_word_combination(word_combination)
-        except IntegrityError:
-            raise WordCombinationAlreadyExistsException()
+        return delete_collection(instance)
 
     def to_representation(self, instance):
         """
@@ -186,21 +264,19 @@ class CollectionCombinationDetailSerializer(serializers.ModelSerializer):
         model = WordCombination
         fields = ['id', 'words']
 
+    def validate_words(self, value):
+        return _check_words(value)
+
     @transaction.atomic
     def update(self, instance, validated_data):
         """
-        Updates word combination with validated data, handling many-to-many relationship.
-        Raises exception if duplicate combination found.
+        Updates word combination with validated data. The combination is changed in place, so it
+        stays in the collection. Raises exception if duplicate combination found.
         """
         word_combination = self.context['word_combination']
 
         try:
-            new_word_combination = _update_combination(word_combination, validated_data, ignore_existing=True)
-
-            instance.word_combinations.add(new_word_combination)
-            instance.word_combinations.remove(word_combination)
-
-            return new_word_combination
+            return _update_combination(word_combination, validated_data, ignore_existing=True)
         except IntegrityError:
             raise WordCombinationAlreadyExistsException(word_combination.id)
 
@@ -209,10 +285,16 @@ class CollectionCombinationDetailSerializer(serializers.ModelSerializer):
         """
         Deletes instance and performs cleanup; raises exception if deletion fails.
         """
-        word_combination = copy.copy(instance)
-
         try:
-            instance.delete()
-            _cleanup_word_combination(word_combination)
+            _delete_combination(instance)
         except IntegrityError:
-            raise WordCombinationAlreadyExistsException()
\ No newline at end of file
+            raise WordCombinationAlreadyExistsException()
+
+class CollectionDeletionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CollectionDeletion
+        fields = [
+            'collection_id', 'status', 'total', 'reclaimed', 'deleted_combinations', 'deleted_entries',
+            'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,79 @@
+"""
+The word_count and preview stored on each collection, so a list of collections needs no joins.
+
+Every write that changes the word combinations of a collection calls ``refresh_summaries``
+inside its transaction: the m2m_changed receiver for ``collection.word_combinations.add()`` and
+friends, the combinations_changed receiver for combinations updated or deleted through the
+dictionary, and the bulk paths of the serializers and import_vocab, which send no signals.
+
+The count is recomputed rather than adjusted, so it can not drift, with one statement for all
+affected collections. The preview holds the first ``PREVIEW_SIZE`` combinations by id in the
+representation of the detail endpoint, read with one short index scan per collection.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Collection
+from dictionary.models import WordCombination
+from dictionary.serializers import get_representation
+from vocabTrainer.cache import bump_table_versions
+
+PREVIEW_SIZE = 3
+
+
+def refresh_summaries(collection_ids, excluding=()):
+    """
+    Recompute the word_count and preview of collections. Must run inside the transaction of the write.
+
+    Args:
+        collection_ids (iterable): The collections whose word combinations changed.
+        excluding (iterable): Word combinations about to be deleted, left out although still linked.
+    """
+    collection_ids = sorted(set(collection_ids))
+    if not collection_ids:
+        return
+    excluding = list(excluding)
+
+    links = Collection.word_combinations.through.objects.filter(collection_id=OuterRef('pk'))
+    if excluding:
+        links = links.exclude(wordcombination_id__in=excluding)
+    counts = links.order_by().values('collection_id').annotate(count=Count('*')).values('count')
+
+    Collection.all_objects.filter(pk__in=collection_ids).update(
+        word_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+    )
+
+    collections = []
+    for collection_id in collection_ids:
+        preview = WordCombination.objects.filter(collections=collection_id).exclude(id__in=excluding)
+        preview = preview.select_related('word1', 'word2').order_by('id')[:PREVIEW_SIZE]
+        collections.append(Collection(id=collection_id, preview=[get_representation(item) for item in preview]))
+    Collection.all_objects.bulk_update(collections, ['preview'])
+
+    # Updated without signals
+    bump_table_versions(Collection)
+
+
+def refresh_membership_summaries(sender, instance, action, reverse, pk_set, **kwargs):
+    """Receiver of m2m_changed on the word combinations of collections."""
+    if action == 'pre_clear' and reverse:
+        # The collections are unknown once the links are gone.
+        instance._cleared_collection_ids = list(
+            sender.objects.filter(wordcombination_id=instance.pk).values_list('collection_id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            refresh_summaries([instance.pk])
+        elif action == 'post_clear':
+            refresh_summaries(getattr(instance, '_cleared_collection_ids', []))
+        else:
+            refresh_summaries(pk_set)
+
+
+def refresh_combination_summaries(sender, updated, deleted, **kwargs):
+    """Receiver of combinations_changed, refreshes every collection the combinations belong to."""
+    collection_ids = Collection.word_combinations.through.objects.filter(
+        wordcombination_id__in=[*updated, *deleted]
+    ).values_list('collection_id', flat=True)
+
+    refresh_summaries(collection_ids, excluding=deleted)
@@ -1,3 +1,518 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from urllib.parse import parse_qs, urlsplit
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date, parse_http_date
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from dictionary.models import DictionaryEntry, WordCombination
+from vocabTrainer.signing import media_response_timeout, verify_media_signature
+from vocabTrainer.thumbnails import create_variants
+from .models import Collection, CollectionDeletion
+
+User = get_user_model()
+
+
+class ImportVocabCommandTestCase(TestCase):
+    def setUp(self):
+        self.collection = Collection.objects.create(name='Basics', creator='testuser', language_combination='en-de')
+
+        hello = DictionaryEntry.objects.create(word='hello', language='en')
+        hallo = DictionaryEntry.objects.create(word='hallo', language='de')
+        self.existing_combination = WordCombination.objects.create(word1=hello, word2=hallo)
+
+    def write_file(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8')
+        file.write(content)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_import_csv(self):
+        path = self.write_file('.csv', 'language1,word1,language2,word2\n'
+                                       'en,house,de,Haus\n'
+                                       'en,hello,de,hallo\n'
+                                       'en,house,en,home\n')
+        out = StringIO()
+        call_command('import_vocab', path, chunk_size=1, stdout=out)
+
+        self.assertEqual(WordCombination.objects.count(), 2)
+        self.assertTrue(DictionaryEntry.objects.filter(word='Haus', language='de').exists())
+        self.assertIn('1 invalid rows skipped', out.getvalue())
+
+    def test_import_jsonl_into_collection(self):
+        rows = [{'id': 99, 'en': 'house', 'de': 'Haus'}, {'de': 'hallo', 'en': 'hello'}]
+        path = self.write_file('.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        call_command('import_vocab', path, collection=self.collection.id, stdout=StringIO())
+
+        self.assertEqual(WordCombination.objects.count(), 2)
+        self.assertEqual(self.collection.word_combinations.count(), 2)
+        self.assertTrue(self.collection.word_combinations.filter(id=self.existing_combination.id).exists())
+
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.word_count, 2)
+
+
+class CollectionAPIEndpointsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(self.token))
+
+        self.collection = Collection.objects.create(name='Basics', creator='testuser', language_combination='en-de')
+        for i in range(20):
+            combination = WordCombination.objects.create(
+                word1=DictionaryEntry.objects.create(word=f'word{i}', language='en'),
+                word2=DictionaryEntry.objects.create(word=f'Wort{i}', language='de')
+            )
+            self.collection.word_combinations.add(combination)
+
+    def test_list_collections_uses_fixed_number_of_queries(self):
+        Collection.objects.create(name='Travel', creator='testuser', language_combination='de-en')
+
+        # user lookup, count and page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('collection'), {'lang': 'en-de'})
+        self.assertEqual(len(response.data), 2)
+
+    def test_list_collections_carries_word_count_and_preview(self):
+        collection = self.client.get(reverse('collection')).data[0]
+        self.assertEqual(collection['word_count'], 20)
+        self.assertEqual([item['en'] for item in collection['preview']], ['word0', 'word1', 'word2'])
+
+        first, second = self.collection.word_combinations.order_by('id')[:2]
+        self.client.post(
+            reverse('collection_detail', args=[self.collection.id]),
+            {'word_combinations': [{'en': 'tree', 'de': 'Baum'}]}, format='json'
+        )
+        self.client.put(reverse('word_combination_detail', args=[first.id]), {'words': {'en': 'house', 'de': 'Haus'}}, format='json')
+        self.client.delete(reverse('word_combination_detail', args=[second.id]))
+
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.word_count, 20)
+        self.assertEqual([item['en'] for item in self.collection.preview], ['house', 'word2', 'word3'])
+
+        self.client.delete(reverse('collection_combinations', args=[self.collection.id]), [first.id], format='json')
+        self.collection.word_combinations.clear()
+        self.collection.refresh_from_db()
+        self.assertEqual((self.collection.word_count, self.collection.preview), (0, []))
+
+    def test_list_collections_is_cached_per_user(self):
+        self.client.get(reverse('collection'))
+        response = self.client.get(reverse('collection'))
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpassword')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(other)))
+        response = self.client.get(reverse('collection'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collection.delete()
+        response = self.client.get(reverse('collection'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data, [])
+
+    def test_list_collection_combinations_uses_fixed_number_of_queries(self):
+        # user lookup, collection, count and page
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('collection_detail', args=[self.collection.id]), {'page_size': 100})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(response.data[0], {'id': response.data[0]['id'], 'en': 'word0', 'de': 'Wort0'})
+
+    def test_collection_combinations_not_modified(self):
+        url = reverse('collection_detail', args=[self.collection.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        # user lookup only, the collection and its combinations are not queried
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'word_combinations': [{'en': 'tree', 'de': 'Baum'}]}, format='json')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_export_collection_reimports(self):
+        response = self.client.get(reverse('collection_export', args=[self.collection.id]), {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('collection-', response['Content-Disposition'])
+
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as file:
+            file.write(b''.join(response.streaming_content))
+        self.addCleanup(os.remove, file.name)
+
+        other = Collection.objects.create(name='Copy', creator='testuser', language_combination='en-de')
+        call_command('import_vocab', file.name, collection=other.id, stdout=StringIO())
+        self.assertEqual(
+            set(other.word_combinations.values_list('id', flat=True)),
+            set(self.collection.word_combinations.values_list('id', flat=True))
+        )
+
+    def test_export_missing_collection(self):
+        response = self.client.get(reverse('collection_export', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_collection_defers_orphan_cleanup(self):
+        shared = self.collection.word_combinations.order_by('id').first()
+        Collection.objects.create(name='Other', creator='testuser', language_combination='en-de').word_combinations.add(shared)
+        standalone = WordCombination.objects.create(
+            word1=DictionaryEntry.objects.create(word='tree', language='en'),
+            word2=DictionaryEntry.objects.create(word='Baum', language='de')
+        )
+
+        # user lookup, collection, savepoint, deleted_at, link count, job and release
+        with self.assertNumQueries(7):
+            response = self.client.delete(reverse('collection_detail', args=[self.collection.id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(WordCombination.objects.count(), 21)
+        self.assertEqual(
+            self.client.get(reverse('collection_detail', args=[self.collection.id])).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+        status_url = reverse('collection_deletion', args=[self.collection.id])
+        self.assertTrue(response.data['status'].endswith(status_url))
+        self.assertEqual(self.client.get(status_url).data['status'], CollectionDeletion.PENDING)
+
+        out = StringIO()
+        call_command('reclaim_collections', chunk_size=7, stdout=out)
+        self.assertIn('Reclaimed 1 deleted collections', out.getvalue())
+
+        deletion = self.client.get(status_url).data
+        self.assertEqual(
+            (deletion['status'], deletion['total'], deletion['reclaimed']), (CollectionDeletion.DONE, 20, 20)
+        )
+        self.assertEqual((deletion['deleted_combinations'], deletion['deleted_entries']), (19, 38))
+        self.assertFalse(Collection.all_objects.filter(pk=self.collection.id).exists())
+        self.assertEqual(
+            set(WordCombination.objects.values_list('id', flat=True)), {shared.id, standalone.id}
+        )
+        self.assertEqual(DictionaryEntry.objects.count(), 4)
+
+    def test_reclaim_collections_skips_leased_jobs(self):
+        with self.captureOnCommitCallbacks():
+            self.client.delete(reverse('collection_detail', args=[self.collection.id]))
+        deletion = CollectionDeletion.objects.get(collection_id=self.collection.id)
+        # Another worker runs the job.
+        deletion.status = CollectionDeletion.RECLAIMING
+        deletion.leased_until = timezone.now() + timedelta(minutes=5)
+        deletion.save()
+
+        out = StringIO()
+        call_command('reclaim_collections', stdout=out)
+        self.assertIn('Reclaimed 0 deleted collections', out.getvalue())
+        self.assertTrue(Collection.all_objects.filter(pk=self.collection.id).exists())
+
+        # The worker died, its lease ran out.
+        CollectionDeletion.objects.filter(pk=deletion.pk).update(leased_until=timezone.now() - timedelta(seconds=1))
+        call_command('reclaim_collections', stdout=out)
+        self.assertIn('Reclaimed 1 deleted collections', out.getvalue())
+        deletion.refresh_from_db()
+        self.assertEqual((deletion.status, deletion.reclaimed), (CollectionDeletion.DONE, 20))
+
+    def test_changes_since_sequence(self):
+        url = reverse('collection_changes', args=[self.collection.id])
+        initial = self.client.get(url).data
+        self.assertEqual(len(initial['upserts']), 20)
+        self.assertFalse(initial['has_more'])
+
+        first, second = self.collection.word_combinations.order_by('id')[:2]
+        detail = reverse('collection_detail', args=[self.collection.id])
+        self.client.post(detail, {'word_combinations': [{'en': 'tree', 'de': 'Baum'}]}, format='json')
+        self.client.put(
+            reverse('collection_combination_detail', args=[self.collection.id, first.id]),
+            {'words': {'en': 'house', 'de': 'Haus'}}, format='json'
+        )
+        self.client.delete(reverse('word_combination_detail', args=[second.id]))
+
+        response = self.client.get(url, {'since': initial['seq'], 'limit': 2})
+        self.assertTrue(response.data['has_more'])
+
+        # user lookup, collection, change log and upserted combinations
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'since': initial['seq']})
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual(response.data['deletes'], [second.id])
+        self.assertEqual(
+            sorted(item.get('en') for item in response.data['upserts']), ['house', 'tree']
+        )
+        self.assertTrue(self.collection.word_combinations.filter(id=first.id).exists())
+
+        response = self.client.get(url, {'since': response.data['seq']})
+        self.assertEqual((response.data['upserts'], response.data['deletes']), ([], []))
+
+    def test_changes_initial_sync_is_paged(self):
+        url = reverse('collection_changes', args=[self.collection.id])
+        page = self.client.get(url, {'limit': 8}).data
+        seq = page['seq']
+        received = [item['id'] for item in page['upserts']]
+
+        # A change made while paging is sent again by the delta feed.
+        first = self.collection.word_combinations.order_by('id').first()
+        self.client.put(
+            reverse('collection_combination_detail', args=[self.collection.id, first.id]),
+            {'words': {'en': 'house', 'de': 'Haus'}}, format='json'
+        )
+
+        while page['has_more']:
+            page = self.client.get(url, {'after': page['after'], 'seq': page['seq'], 'limit': 8}).data
+            self.assertEqual(page['seq'], seq)
+            received += [item['id'] for item in page['upserts']]
+
+        self.assertEqual(received, list(self.collection.word_combinations.order_by('id').values_list('id', flat=True)))
+        response = self.client.get(url, {'since': seq})
+        self.assertEqual([item['en'] for item in response.data['upserts']], ['house'])
+
+    def test_changes_of_related_manager_are_logged(self):
+        url = reverse('collection_changes', args=[self.collection.id])
+        seq = self.client.get(url).data['seq']
+        first, second = self.collection.word_combinations.order_by('id')[:2]
+        tree = WordCombination.objects.create(
+            word1=DictionaryEntry.objects.create(word='tree', language='en'),
+            word2=DictionaryEntry.objects.create(word='Baum', language='de')
+        )
+
+        self.collection.word_combinations.add(tree)
+        self.collection.word_combinations.remove(first)
+        second.collections.clear()
+
+        response = self.client.get(url, {'since': seq})
+        self.assertEqual([item['id'] for item in response.data['upserts']], [tree.id])
+        self.assertEqual(response.data['deletes'], [first.id, second.id])
+
+        self.collection.word_combinations.clear()
+        response = self.client.get(url, {'since': response.data['seq']})
+        self.assertEqual(len(response.data['deletes']), 19)
+
+    def test_bulk_remove_combinations(self):
+        ids = list(self.collection.word_combinations.order_by('id').values_list('id', flat=True))
+        shared = ids[0]
+        Collection.objects.create(name='Other', creator='testuser', language_combination='en-de').word_combinations.add(shared)
+
+        url = reverse('collection_combinations', args=[self.collection.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url, ids[:10] + [0, 999], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], ids[:10])
+        self.assertEqual(response.data['not_found'], [999])
+        self.assertEqual(len(response.data['invalid']), 1)
+
+        self.assertEqual(self.collection.word_combinations.count(), 10)
+        # The combinations stay, only those left in no collection are marked for the sweeper
+        self.assertEqual(WordCombination.objects.count(), 20)
+        self.assertEqual(WordCombination.objects.filter(orphaned_at__isnull=False).count(), 9)
+
+        changes = self.client.get(reverse('collection_changes', args=[self.collection.id]), {'since': 0}).data
+        self.assertEqual(changes['deletes'], ids[:10])
+        response = self.client.get(reverse('collection_detail', args=[self.collection.id]))
+        self.assertEqual(response.data[0]['id'], ids[10])
+
+    def test_add_combinations_constant_query_count(self):
+        url = reverse('collection_detail', args=[self.collection.id])
+        small = [{'en': f'small{i}', 'de': f'klein{i}'} for i in range(2)]
+        large = [{'en': f'large{i}', 'de': f'gross{i}'} for i in range(50)]
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(url, {'word_combinations': small}, format='json')
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.client.post(url, {'word_combinations': large}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['en'] for item in response.data], [item['en'] for item in large])
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(self.collection.word_combinations.count(), 72)
+
+    def test_add_existing_combinations(self):
+        url = reverse('collection_detail', args=[self.collection.id])
+        data = {'word_combinations': [{'en': 'tree', 'de': 'Baum'}, {'en': 'word0', 'de': 'Wort0'}]}
+
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.collection.word_combinations.count(), 20)
+
+        response = self.client.post(url + '?on_conflict=ignore', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['en'] for item in response.data], ['tree', 'word0'])
+        self.assertEqual(self.collection.word_combinations.count(), 21)
+
+        response = self.client.post(url, {'word_combinations': [{'en': 'tree'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_signed_image_url(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, 'collections'))
+        with open(os.path.join(root, 'collections', 'cover.png'), 'wb') as file:
+            file.write(b'\x89PNG\r\n\x1a\n')
+
+        self.collection.image = 'collections/cover.png'
+        self.collection.save()
+
+        with override_settings(MEDIA_ROOT=root):
+            url = self.client.get(reverse('collection')).data[0]['image']
+            self.assertNotIn('token=', url)
+
+            self.client.credentials()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), b'\x89PNG\r\n\x1a\n')
+
+            forged = url.replace(f'user={self.user.id}', f'user={self.user.id + 1}')
+            self.assertEqual(self.client.get(forged).status_code, status.HTTP_401_UNAUTHORIZED)
+            with mock.patch('time.time', return_value=time.time() + 3600):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_list_serves_valid_image_urls(self):
+        self.collection.image = 'collections/cover.png'
+        self.collection.save()
+        started = time.time()
+        timeout = media_response_timeout()
+
+        with mock.patch('time.time', return_value=started):
+            response = self.client.get(reverse('collection'))
+            self.assertEqual(response['X-Cache'], 'MISS')
+
+        # Just before the cached response expires its URLs are still valid for half their lifetime.
+        now = started + timeout - 1
+        with mock.patch('time.time', return_value=now):
+            response = self.client.get(reverse('collection'))
+            self.assertEqual(response['X-Cache'], 'HIT')
+
+            params = parse_qs(urlsplit(response.data[0]['image']).query)
+            self.assertTrue(verify_media_signature('collections/cover.png', {key: value[0] for key, value in params.items()}))
+            self.assertGreaterEqual(int(params['expires'][0]) - now, settings.MEDIA_URL_LIFETIME - timeout)
+
+        with mock.patch('time.time', return_value=started + timeout + 1):
+            self.assertEqual(self.client.get(reverse('collection'))['X-Cache'], 'MISS')
+
+    def test_image_range_and_conditional_requests(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, 'collections'))
+        content = bytes(range(256)) * 1024
+        with open(os.path.join(root, 'collections', 'cover.jpg'), 'wb') as file:
+            file.write(content)
+
+        url = reverse('secure_image', kwargs={'image_path': 'collections/cover.jpg'})
+        with override_settings(MEDIA_ROOT=root):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.streaming)
+            self.assertEqual(b''.join(response.streaming_content), content)
+            self.assertEqual(response['Content-Length'], str(len(content)))
+            self.assertIn('private', response['Cache-Control'])
+
+            response = self.client.get(url, HTTP_RANGE='bytes=100-199')
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(b''.join(response.streaming_content), content[100:200])
+
+            etag = response['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+            last_modified = response['Last-Modified']
+            outdated = http_date(parse_http_date(last_modified) - 60)
+            for if_range, expected in ((etag, 206), ('"other"', 200), ('W/' + etag, 200), (last_modified, 206), (outdated, 200)):
+                response = self.client.get(url, HTTP_RANGE='bytes=100-199', HTTP_IF_RANGE=if_range)
+                self.assertEqual(response.status_code, expected, if_range)
+
+            with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Accel-Redirect'], '/protected-media/collections/cover.jpg')
+            self.assertEqual(response.content, b'')
+
+            self.assertEqual(self.client.get(url.replace('cover', '../../cover')).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_image_variants(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, 'collections'))
+        Image.new('RGB', (2000, 1000), 'red').save(os.path.join(root, 'collections', 'cover.jpg'))
+
+        self.collection.image = 'collections/cover.jpg'
+        self.collection.save()
+
+        with override_settings(MEDIA_ROOT=root, MEDIA_VARIANT_ROOT=os.path.join(root, 'variants')):
+            url = self.client.get(reverse('collection')).data[0]['image']
+            self.assertTrue(url.endswith('&w=256'))
+
+            response = self.client.get(url, HTTP_ACCEPT='image/webp,image/*')
+            self.assertEqual(response['Content-Type'], 'image/webp')
+            self.assertEqual(response['Vary'], 'Accept')
+            with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+                self.assertEqual(image.size, (256, 128))
+
+            response = self.client.get(url.replace('w=256', 'w=5000'))
+            self.assertEqual(response['Content-Type'], 'image/jpeg')
+            with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+                self.assertEqual(image.size, (1024, 512))
+
+            with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+                response = self.client.get(url.replace('w=256', 'w=128'))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+            create_variants('collections/cover.jpg')
+            self.assertTrue(os.path.exists(os.path.join(root, 'variants', '64', 'collections', 'cover.jpg.webp')))
+
+    def test_content_addressed_images(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), 'blue').save(buffer, 'PNG')
+
+        with override_settings(MEDIA_ROOT=root):
+            storage = Collection._meta.get_field('image').storage
+            name = storage.save('collections/cover.PNG', ContentFile(buffer.getvalue()))
+            self.assertRegex(name, r'^collections/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+            self.assertEqual(storage.save('collections/copy.png', ContentFile(buffer.getvalue())), name)
+            unreferenced = storage.save('collections/other.png', ContentFile(b'other'))
+
+            self.collection.image = name
+            self.collection.save()
+            with open(os.path.join(root, 'collections', 'legacy.png'), 'wb') as file:
+                file.write(buffer.getvalue())
+            travel = Collection.objects.create(
+                name='Travel', creator='testuser', language_combination='en-de', image='collections/legacy.png'
+            )
+
+            out = StringIO()
+            call_command('sweep_media', store_legacy=True, grace=0, stdout=out)
+            self.assertIn('Deleted 2 unreferenced images', out.getvalue())
+
+            travel.refresh_from_db()
+            self.assertEqual(travel.image.name, name)
+            self.assertTrue(storage.exists(name))
+            self.assertFalse(storage.exists(unreferenced))
+            self.assertFalse(storage.exists('collections/legacy.png'))
+
+            response = self.client.get(reverse('secure_image', kwargs={'image_path': name}))
+            self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+            self.assertEqual(response['ETag'], f'"{os.path.basename(name)[:-4]}"')
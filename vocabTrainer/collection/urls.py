@@ -4,12 +4,20 @@ from django.conf.urls.static import static
 from .views import (
     CollectionView,
     CollectionDetailView,
+    CollectionExportView,
+    CollectionChangesView,
+    CollectionDeletionView,
+    CollectionCombinationsView,
     CollectionCombinationDetailView
 )
 
 urlpatterns = [
     path('', CollectionView.as_view(), name='collection'),
     path('<int:pk>/', CollectionDetailView.as_view(), name='collection_detail'),
+    path('<int:pk>/export/', CollectionExportView.as_view(), name='collection_export'),
+    path('<int:pk>/combinations/', CollectionCombinationsView.as_view(), name='collection_combinations'),
+    path('<int:pk>/changes/', CollectionChangesView.as_view(), name='collection_changes'),
+    path('<int:pk>/deletion/', CollectionDeletionView.as_view(), name='collection_deletion'),
     path('<int:pk>/<int:word_combination_pk>/', CollectionCombinationDetailView.as_view(), name='collection_combination_detail'),
 ]
 
@@ -1,14 +1,26 @@
 from django.db.models import Q
+from django.urls import reverse
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, status
 from rest_framework.response import Response
 import logging
 
+from .changes import CHANGES_BATCH_SIZE, changes_since, collection_snapshot
 from .exceptions import CollectionNotFoundException, WordCombinationOfCollectionNotFoundException
-from .models import Collection
-from .serializers import CollectionSerializer, CollectionDetailSerializer, CollectionCombinationDetailSerializer
+from .models import Collection, CollectionDeletion
+from dictionary.models import DictionaryEntry, WordCombination
+from .serializers import (
+    CollectionSerializer,
+    CollectionDetailSerializer,
+    CollectionCombinationDetailSerializer,
+    CollectionDeletionSerializer,
+    _bulk_remove_combinations
+)
+from dictionary.export import EXPORT_RENDERERS, export_response
 from dictionary.serializers import WordCombinationSerializer
+from vocabTrainer.cache import cache_response, conditional_response
+from vocabTrainer.signing import media_response_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +47,8 @@ class CollectionView(generics.ListCreateAPIView):
         operation_summary='Retrieve collections',
         operation_description='Get a list of all collections.'
     )
+    # The signed image URLs in the list must outlive the cached response.
+    @cache_response(Collection, vary_on_user=True, timeout=media_response_timeout)
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
@@ -42,7 +56,7 @@ class CollectionView(generics.ListCreateAPIView):
         serializer = self.get_serializer(page, many=True)
 
         logger.info('Retrieving collections')
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers=self.paginator.get_pagination_headers())
 
     @swagger_auto_schema(
         request_body=CollectionSerializer,
@@ -70,30 +84,40 @@ class CollectionDetailView(generics.ListCreateAPIView):
         operation_summary='Retrieve word combinations of a collection',
         operation_description='Get a list of all word combinations of a collection.'
     )
+    @conditional_response(Collection, Collection.word_combinations.through, WordCombination, DictionaryEntry)
     def get(self, request, *args, **kwargs):
         collection_id, collection = self.get_object()
 
-        queryset = collection.word_combinations.all().order_by('id')
+        queryset = collection.word_combinations.select_related('word1', 'word2').order_by('id')
         page = self.paginate_queryset(queryset)
 
         serializer = WordCombinationSerializer(page, many=True)
 
         logger.info(f'Retrieving word combinations of collections with id {collection_id}')
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers=self.paginator.get_pagination_headers())
 
     @swagger_auto_schema(
         request_body=CollectionDetailSerializer,
+        manual_parameters=[
+            openapi.Parameter('on_conflict', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['error', 'ignore'],
+                              description='error (default) answers 409 if a combination is already part of the '
+                                          'collection, ignore skips it'),
+        ],
         responses={
             status.HTTP_201_CREATED: CollectionDetailSerializer,
-            status.HTTP_400_BAD_REQUEST: 'Already exists or due to wrong formatting',
+            status.HTTP_400_BAD_REQUEST: 'Wrong formatting',
+            status.HTTP_409_CONFLICT: 'Already part of the collection',
         },
         operation_summary='Create a new word combination for a collection',
-        operation_description='Add a new word combination for a collection.'
+        operation_description='Add new word combinations for a collection.'
     )
     def post(self, request, *args, **kwargs):
         collection_id, collection = self.get_object()
 
-        serializer = self.get_serializer(data=request.data, context={'collection': collection})
+        serializer = self.get_serializer(
+            data=request.data,
+            context={'collection': collection, 'on_conflict': request.query_params.get('on_conflict', 'error')}
+        )
         serializer.is_valid(raise_exception=True)
         word_combinations = serializer.save()
 
@@ -123,19 +147,21 @@ class CollectionDetailView(generics.ListCreateAPIView):
 
     @swagger_auto_schema(
         responses={
-            status.HTTP_204_NO_CONTENT: openapi.Response(
-                description='Successfully deleted the collection',
+            status.HTTP_202_ACCEPTED: openapi.Response(
+                description='The collection is deleted, its word combinations are removed in the background',
                 schema=openapi.Schema(
                     type=openapi.TYPE_OBJECT,
                     properties={
                         'deleted_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='The ID of the deleted collection'),
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, description='The URL of the deletion status'),
                     }
                 ),
             ),
             status.HTTP_404_NOT_FOUND: 'Collection not found'
         },
         operation_summary='Delete a collection',
-        operation_description='Delete a collection and all its associated word combinations.'
+        operation_description='Delete a collection and all its associated word combinations. The collection is gone '
+                              'at once, its word combinations are removed in the background.'
     )
     def delete(self, request, *args, **kwargs):
         collection_id, collection = self.get_object()
@@ -144,7 +170,13 @@ class CollectionDetailView(generics.ListCreateAPIView):
         serializer.delete(collection)
 
         logger.info(f'Deleted collection with id {collection_id}')
-        return Response({'deleted_id': collection_id}, status=status.HTTP_204_NO_CONTENT)
+        return Response(
+            {
+                'deleted_id': collection_id,
+                'status': request.build_absolute_uri(reverse('collection_deletion', kwargs={'pk': collection_id})),
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
 
     def get_object(self):
         """Helper method to get the Collection instance by ID."""
@@ -157,6 +189,149 @@ class CollectionDetailView(generics.ListCreateAPIView):
 
         return collection_id, collection
 
+class CollectionExportView(generics.GenericAPIView):
+    serializer_class = WordCombinationSerializer
+    renderer_classes = EXPORT_RENDERERS
+    pagination_class = None
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['ndjson', 'csv']),
+        ],
+        responses={
+            status.HTTP_200_OK: 'One word combination per line',
+            status.HTTP_404_NOT_FOUND: 'Collection not found'
+        },
+        operation_summary='Export the word combinations of a collection',
+        operation_description='Stream all word combinations of a collection as NDJSON or CSV.'
+    )
+    def get(self, request, *args, **kwargs):
+        collection_id = self.kwargs.get('pk')
+        if not Collection.objects.filter(pk=collection_id).exists():
+            raise CollectionNotFoundException()
+
+        queryset = WordCombination.objects.filter(collections=collection_id).order_by('id')
+
+        logger.info(f'Exporting word combinations of collection with id {collection_id}')
+        return export_response(queryset, request.accepted_renderer.format, f'collection-{collection_id}')
+
+class CollectionCombinationsView(generics.GenericAPIView):
+    serializer_class = WordCombinationSerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+        responses={
+            status.HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'deleted': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    'not_found': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    'invalid': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: 'Not a list or more than 1000 ids',
+            status.HTTP_404_NOT_FOUND: 'Collection not found'
+        },
+        operation_summary='Remove word combinations from a collection',
+        operation_description='Unlink the word combinations of a JSON array of ids from a collection and report '
+                              'the removed, unknown and invalid ids. The combinations stay in the dictionary.'
+    )
+    def delete(self, request, *args, **kwargs):
+        collection_id = self.kwargs.get('pk')
+
+        try:
+            collection = Collection.objects.get(pk=collection_id)
+        except Collection.DoesNotExist:
+            raise CollectionNotFoundException()
+
+        result = _bulk_remove_combinations(collection, request.data)
+
+        logger.info(f'Removed {len(result["deleted"])} word combinations from collection with id {collection_id}')
+        return Response(result, status=status.HTTP_200_OK)
+
+class CollectionChangesView(generics.GenericAPIView):
+    serializer_class = WordCombinationSerializer
+    pagination_class = None
+    max_limit = 5000
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='The seq of the last applied changes, missing for the whole collection'),
+            openapi.Parameter('after', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Without since, the after of the previous page of the whole collection'),
+            openapi.Parameter('seq', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Without since, the seq of the previous page of the whole collection'),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            status.HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'seq': openapi.Schema(type=openapi.TYPE_INTEGER, description='Pass as since on the next sync'),
+                    'has_more': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                    'after': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                            description='Without since, pass with seq for the next page'),
+                    'upserts': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'deletes': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                }
+            ),
+            status.HTTP_404_NOT_FOUND: 'Collection not found'
+        },
+        operation_summary='Sync the word combinations of a collection',
+        operation_description='Get the word combinations added, updated or removed since a sequence number, '
+                              'in batches. Repeat with since=seq while has_more is true. Without since, '
+                              'the whole collection is sent in pages, repeat with after and seq while '
+                              'has_more is true, then continue with since=seq.'
+    )
+    def get(self, request, *args, **kwargs):
+        collection_id = self.kwargs.get('pk')
+        if not Collection.objects.filter(pk=collection_id).exists():
+            raise CollectionNotFoundException()
+
+        since, after, seq = (self._get_int(request, name) for name in ('since', 'after', 'seq'))
+        limit = self._get_int(request, 'limit') or CHANGES_BATCH_SIZE
+        limit = max(1, min(limit, self.max_limit))
+
+        if since is None:
+            changes = collection_snapshot(collection_id, after or 0, seq, limit)
+        else:
+            changes = changes_since(collection_id, since, limit)
+
+        logger.info(f'Retrieving changes of collection with id {collection_id} since {since}')
+        return Response(changes, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _get_int(request, name):
+        try:
+            return int(request.query_params[name])
+        except (KeyError, ValueError):
+            return None
+
+class CollectionDeletionView(generics.GenericAPIView):
+    serializer_class = CollectionDeletionSerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        responses={
+            status.HTTP_200_OK: CollectionDeletionSerializer,
+            status.HTTP_404_NOT_FOUND: 'Collection was not deleted'
+        },
+        operation_summary='Retrieve the deletion status of a collection',
+        operation_description='Get the progress of removing the word combinations of a deleted collection.'
+    )
+    def get(self, request, *args, **kwargs):
+        collection_id = self.kwargs.get('pk')
+
+        try:
+            deletion = CollectionDeletion.objects.get(collection_id=collection_id)
+        except CollectionDeletion.DoesNotExist:
+            raise CollectionNotFoundException()
+
+        logger.info(f'Retrieving deletion status of collection with id {collection_id}')
+        return Response(self.get_serializer(deletion).data, status=status.HTTP_200_OK)
+
 class CollectionCombinationDetailView(generics.DestroyAPIView):
     serializer_class = CollectionCombinationDetailSerializer
     lookup_field = 'pk'
@@ -223,7 +398,7 @@ class CollectionCombinationDetailView(generics.DestroyAPIView):
             raise CollectionNotFoundException()
 
         try:
-            word_combination = collection.word_combinations.get(pk=word_combination_id)
+            word_combination = collection.word_combinations.select_related('word1', 'word2').get(pk=word_combination_id)
         except collection.word_combinations.model.DoesNotExist:
             raise WordCombinationOfCollectionNotFoundException()
 
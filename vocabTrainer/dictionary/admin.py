@@ -3,7 +3,8 @@ from django.db import transaction, IntegrityError
 from .serializers import _delete_combination, _create_combination, _update_combination
 from django import forms
 from django.contrib import messages
-from .models import WordCombination, DictionaryEntry
+from django.db.models import Q
+from .models import WordCombination, DictionaryEntry, search_key
 
 LANGUAGE_CHOICES = [
     ('en', 'English'),
@@ -60,9 +61,17 @@ def remove_default_message(request):
 
 class WordCombinationAdmin(admin.ModelAdmin):
     list_display = ('word1__word', 'word2__word')
-    search_fields = ('word1__word', 'word2__word')
+    search_fields = ('word1__search_key', 'word2__search_key')
     form = WordCombinationForm
 
+    def get_search_results(self, request, queryset, search_term):
+        """Match words starting with the search term, ignoring case, on the search key index."""
+        if not search_term:
+            return queryset, False
+
+        key = search_key(search_term)
+        return queryset.filter(Q(word1__search_key__startswith=key) | Q(word2__search_key__startswith=key)), False
+
     def response_add(self, request, obj, post_url_continue=None):
         """override"""
         response = super().response_add(request, obj, post_url_continue)
@@ -116,7 +125,14 @@ class WordCombinationAdmin(admin.ModelAdmin):
 
 class DictionaryEntryAdmin(admin.ModelAdmin):
     list_display = ('word', 'language')
-    search_fields = ('word', 'language')
+    search_fields = ('search_key', 'language')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match words starting with the search term, ignoring case, or the exact language."""
+        if not search_term:
+            return queryset, False
+
+        return queryset.filter(Q(search_key__startswith=search_key(search_term)) | Q(language=search_term)), False
 
     def has_add_permission(self, request):
         """Disable adding new DictionaryEntry."""
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class DictionaryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dictionary'
+
+    def ready(self):
+        from vocabTrainer.cache import connect_version_signals
+        from .models import DictionaryEntry, WordCombination
+        connect_version_signals(DictionaryEntry, WordCombination)
+
+        interval = getattr(settings, 'ORPHAN_SWEEP_INTERVAL', None)
+        if interval:
+            from .orphans import OrphanSweeper
+            OrphanSweeper(interval).start()
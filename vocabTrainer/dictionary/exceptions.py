@@ -29,3 +29,40 @@ class WordCombinationNotFoundException(APIException):
         if detail is None:
             detail = "Die Wort-Kombination wurde nicht gefunden."
         super().__init__(detail=detail)
+
+
+class SearchParameterException(APIException):
+    status_code = 400
+    default_code = "search_parameter"
+
+    def __init__(self, detail=None):
+        if detail is None:
+            detail = "Die Suchparameter sind ungültig."
+        super().__init__(detail=detail)
+
+class SnapshotNotFoundException(APIException):
+    status_code = 404
+    default_code = "snapshot_not_found"
+
+    def __init__(self, detail=None):
+        if detail is None:
+            detail = "Der Snapshot wurde nicht gefunden."
+        super().__init__(detail=detail)
+
+class BulkCreateException(APIException):
+    status_code = 400
+    default_code = "bulk_create"
+
+    def __init__(self, detail=None):
+        if detail is None:
+            detail = "Erwartet wird eine Liste von höchstens 1000 Wort-Kombinationen."
+        super().__init__(detail=detail)
+
+class BulkDeleteException(APIException):
+    status_code = 400
+    default_code = "bulk_delete"
+
+    def __init__(self, detail=None):
+        if detail is None:
+            detail = "Erwartet wird eine Liste von höchstens 1000 IDs."
+        super().__init__(detail=detail)
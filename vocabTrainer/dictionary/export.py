@@ -0,0 +1,89 @@
+"""
+Streaming exports of word combinations as NDJSON or CSV.
+
+The rows are read with ``values_list(...).iterator()``, a server-side cursor on PostgreSQL, and
+written out chunk by chunk, so memory stays flat however large the export is and the first
+bytes leave before the query has finished. Both formats can be read back by the import_vocab
+management command.
+"""
+import csv
+import io
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+
+COLUMNS = ('id', 'word1__language', 'word1__word', 'word2__language', 'word2__word')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Selects the NDJSON export, also renders error responses as a single JSON line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data, ensure_ascii=False) + '\n').encode() if data is not None else b''
+
+
+class CSVRenderer(NDJSONRenderer):
+    """Selects the CSV export, error responses are still JSON."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+EXPORT_RENDERERS = [NDJSONRenderer, CSVRenderer]
+
+
+def _ndjson_lines(rows):
+    for combination_id, language1, word1, language2, word2 in rows:
+        yield json.dumps({'id': combination_id, language1: word1, language2: word2}, ensure_ascii=False) + '\n'
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(('id', 'language1', 'word1', 'language2', 'word2'))
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_response(queryset, file_format, filename):
+    """
+    Stream the word combinations of a queryset.
+
+    Args:
+        queryset (QuerySet): The word combinations to export, in the order they are written.
+        file_format (str): 'ndjson' or 'csv'.
+        filename (str): The download name without extension.
+
+    Returns:
+        StreamingHttpResponse: The export, one combination per line.
+    """
+    rows = queryset.values_list(*COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if file_format == 'csv':
+        lines, content_type = _csv_lines(rows), 'text/csv; charset=utf-8'
+    else:
+        lines, content_type = _ndjson_lines(rows), 'application/x-ndjson; charset=utf-8'
+
+    response = StreamingHttpResponse(_chunks(lines, EXPORT_CHUNK_SIZE), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dictionary.models import WordCombination, canonical_language_pair
+from dictionary.snapshots import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Build the offline SQLite snapshots and deltas of the dictionary, one per language pair.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('language_pairs', nargs='*', help='Language pairs like en-de, all of them by default.')
+        parser.add_argument('--keep', type=int, help='Snapshots retained per language pair.')
+
+    def handle(self, *args, **options):
+        language_pairs = []
+        for language_pair in options['language_pairs']:
+            parts = language_pair.split('-')
+            if len(parts) != 2:
+                raise CommandError(f'Invalid language pair {language_pair}, use e.g. en-de.')
+            language_pairs.append(canonical_language_pair(*parts))
+
+        if not language_pairs:
+            language_pairs = WordCombination.objects.order_by('language_pair').values_list('language_pair', flat=True).distinct()
+
+        for language_pair in language_pairs:
+            started = time.monotonic()
+            manifest, created = build_snapshot(language_pair, options['keep'])
+
+            snapshot = manifest['snapshots'][0]
+            state = 'built' if created else 'unchanged'
+            self.stdout.write(
+                f'{language_pair}: version {snapshot["version"]} {state}, {snapshot["combinations"]} combinations, '
+                f'{snapshot["size"]} bytes, {len(manifest["deltas"])} deltas ({time.monotonic() - started:.1f}s)'
+            )
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dictionary.models import DictionaryEntry, search_key
+from dictionary.search import prefix_index
+from vocabTrainer.cache import bump_table_versions
+
+
+class Command(BaseCommand):
+    help = 'Recompute the search keys of all dictionary entries, e.g. after changing DICTIONARY_FOLD_ACCENTS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows read and updated per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated = 0
+
+        last_id = 0
+        while True:
+            entries = list(
+                DictionaryEntry.objects.filter(id__gt=last_id).order_by('id').only('id', 'word', 'search_key')
+                [:options['chunk_size']]
+            )
+            if not entries:
+                break
+
+            changed = [entry for entry in entries if entry.search_key != search_key(entry.word)]
+            for entry in changed:
+                entry.search_key = search_key(entry.word)
+
+            with transaction.atomic():
+                DictionaryEntry.objects.bulk_update(changed, ['search_key'])
+                # Updated without signals
+                bump_table_versions(DictionaryEntry)
+
+            updated += len(changed)
+            last_id = entries[-1].id
+
+        prefix_index.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the search keys of {updated} dictionary entries in {time.monotonic() - started:.1f}s.'
+        ))
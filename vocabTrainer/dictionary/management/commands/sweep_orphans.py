@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dictionary.orphans import sweep_orphans
+
+
+class Command(BaseCommand):
+    help = 'Delete word combinations removed from their last collection and unreferenced dictionary entries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows deleted per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deleted = sweep_orphans(options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted["combinations"]} word combinations and {deleted["entries"]} dictionary entries '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from ._merge import merge_entries
+
+
+def dedupe_dictionary_entries(apps, schema_editor):
+    """
+    Merge dictionary entries with the same (language, word) into the one with the lowest id.
+    """
+    DictionaryEntry = apps.get_model('dictionary', 'DictionaryEntry')
+    WordCombination = apps.get_model('dictionary', 'WordCombination')
+    Through = apps.get_model('collection', 'Collection').word_combinations.through
+
+    duplicates = (
+        DictionaryEntry.objects.values('language', 'word')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+
+    for group in duplicates:
+        duplicate_ids = DictionaryEntry.objects.filter(
+            language=group['language'], word=group['word']
+        ).exclude(id=group['keep_id']).values_list('id', flat=True)
+
+        merge_entries(DictionaryEntry, WordCombination, Through, group['keep_id'], list(duplicate_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0002_remove_dictionaryentry_description_and_more'),
+        ('collection', '0007_delete_collectioncombinations_collectioncombination'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_dictionary_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dictionaryentry',
+            constraint=models.UniqueConstraint(fields=('language', 'word'), name='dictionary_entry_unique_language_word'),
+        ),
+    ]
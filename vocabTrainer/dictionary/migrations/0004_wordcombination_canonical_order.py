@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Exists
+
+from ._merge import merge_combination
+
+
+def normalize_combination_order(apps, schema_editor):
+    """
+    Store every combination as (lower entry id, higher entry id).
+
+    Reversed rows whose canonical twin already exists are merged into the twin first,
+    the remaining reversed rows are swapped with a single UPDATE.
+    """
+    WordCombination = apps.get_model('dictionary', 'WordCombination')
+    Through = apps.get_model('collection', 'Collection').word_combinations.through
+
+    WordCombination.objects.filter(word1_id=F('word2_id')).delete()
+
+    twins = WordCombination.objects.filter(word1_id=OuterRef('word2_id'), word2_id=OuterRef('word1_id'))
+    conflicting = WordCombination.objects.filter(word1_id__gt=F('word2_id')).filter(Exists(twins))
+    for combination in conflicting.iterator():
+        twin = WordCombination.objects.get(word1_id=combination.word2_id, word2_id=combination.word1_id)
+        merge_combination(Through, twin, combination)
+
+    WordCombination.objects.filter(word1_id__gt=F('word2_id')).update(
+        word1_id=F('word2_id'),
+        word2_id=F('word1_id')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0003_dictionaryentry_unique_language_word'),
+        ('collection', '0007_delete_collectioncombinations_collectioncombination'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_combination_order, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='wordcombination',
+            constraint=models.CheckConstraint(condition=models.Q(('word1__lt', models.F('word2'))), name='word_combination_canonical_order'),
+        ),
+    ]
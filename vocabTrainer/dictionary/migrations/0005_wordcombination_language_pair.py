@@ -0,0 +1,75 @@
+from django.db import migrations, models, transaction
+
+CHUNK_SIZE = 5000
+
+PAIR_INDEX = models.Index(fields=['language_pair', 'id'], name='word_combination_pair_id_idx')
+
+
+def backfill_language_pair(apps, schema_editor):
+    """
+    Fill language_pair for the existing rows, one short transaction per chunk of ids
+    so the table is never locked for the whole backfill.
+    """
+    WordCombination = apps.get_model('dictionary', 'WordCombination')
+
+    last_id = 0
+    while True:
+        rows = list(
+            WordCombination.objects.filter(id__gt=last_id, language_pair='')
+            .order_by('id')
+            .values_list('id', 'word1__language', 'word2__language')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+
+        pairs = {}
+        for combination_id, language1, language2 in rows:
+            pairs.setdefault('-'.join(sorted((language1, language2))), []).append(combination_id)
+
+        with transaction.atomic():
+            for language_pair, ids in pairs.items():
+                WordCombination.objects.filter(id__in=ids).update(language_pair=language_pair)
+
+        last_id = rows[-1][0]
+
+
+def add_pair_index(apps, schema_editor):
+    """
+    Build the index with CREATE INDEX CONCURRENTLY on PostgreSQL, so writes to the table are not
+    blocked meanwhile, the plain way on other databases.
+    """
+    WordCombination = apps.get_model('dictionary', 'WordCombination')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(WordCombination, PAIR_INDEX, concurrently=True)
+    else:
+        schema_editor.add_index(WordCombination, PAIR_INDEX)
+
+
+def remove_pair_index(apps, schema_editor):
+    WordCombination = apps.get_model('dictionary', 'WordCombination')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(WordCombination, PAIR_INDEX, concurrently=True)
+    else:
+        schema_editor.remove_index(WordCombination, PAIR_INDEX)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('dictionary', '0004_wordcombination_canonical_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordcombination',
+            name='language_pair',
+            field=models.CharField(blank=True, default='', max_length=101),
+        ),
+        migrations.RunPython(backfill_language_pair, migrations.RunPython.noop),
+        # Concurrent builds can not run in a transaction, which is why the migration is not atomic.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='wordcombination', index=PAIR_INDEX)],
+            database_operations=[migrations.RunPython(add_pair_index, remove_pair_index)],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0005_wordcombination_language_pair'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordcombination',
+            name='orphaned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='wordcombination',
+            index=models.Index(
+                condition=models.Q(orphaned_at__isnull=False),
+                fields=['orphaned_at'],
+                name='word_combination_orphaned_idx'
+            ),
+        ),
+    ]
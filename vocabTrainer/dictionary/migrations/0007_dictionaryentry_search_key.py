@@ -0,0 +1,65 @@
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+CHUNK_SIZE = 5000
+
+
+def search_key(word):
+    """A copy of dictionary.models.search_key as of this migration, later changes must not alter it."""
+    if word.isascii():
+        return ' '.join(word.lower().split())
+
+    key = unicodedata.normalize('NFKC', unicodedata.normalize('NFKC', word).casefold())
+    key = ' '.join(key.split())
+
+    if getattr(settings, 'DICTIONARY_FOLD_ACCENTS', False):
+        key = ''.join(char for char in unicodedata.normalize('NFD', key) if not unicodedata.combining(char))
+        key = unicodedata.normalize('NFC', key)
+
+    return key[:200]
+
+
+def backfill_search_key(apps, schema_editor):
+    """Fill search_key for the existing rows, one short transaction per chunk of ids."""
+    DictionaryEntry = apps.get_model('dictionary', 'DictionaryEntry')
+
+    last_id = 0
+    while True:
+        entries = list(DictionaryEntry.objects.filter(id__gt=last_id).order_by('id').only('id', 'word')[:CHUNK_SIZE])
+        if not entries:
+            break
+
+        for entry in entries:
+            entry.search_key = search_key(entry.word)
+
+        with transaction.atomic():
+            DictionaryEntry.objects.bulk_update(entries, ['search_key'])
+
+        last_id = entries[-1].id
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('dictionary', '0006_wordcombination_orphaned_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dictionaryentry',
+            name='search_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_search_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dictionaryentry',
+            index=models.Index(
+                fields=['search_key', 'language'],
+                name='dictionary_entry_key_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+"""
+Helpers shared by the data migrations that merge duplicate dictionary rows.
+
+They work on historical models, so the calling migration passes the models it got from ``apps``.
+"""
+from django.db.models import Q
+
+
+def merge_combination(Through, keep, duplicate):
+    """Move the collection memberships of duplicate to keep and delete duplicate."""
+    member_of = Through.objects.filter(wordcombination_id=keep.id).values_list('collection_id', flat=True)
+    Through.objects.filter(wordcombination_id=duplicate.id).exclude(collection_id__in=member_of).update(
+        wordcombination_id=keep.id
+    )
+    duplicate.delete()
+
+
+def repoint_combination(WordCombination, Through, combination, word1_id, word2_id):
+    """
+    Point combination at the given entries, merging it into an existing combination of the same pair.
+    """
+    if word1_id == word2_id:
+        combination.delete()
+        return
+
+    twin = WordCombination.objects.filter(
+        Q(word1_id=word1_id, word2_id=word2_id) | Q(word1_id=word2_id, word2_id=word1_id)
+    ).exclude(id=combination.id).order_by('id').first()
+
+    if twin:
+        merge_combination(Through, twin, combination)
+        return
+
+    combination.word1_id = word1_id
+    combination.word2_id = word2_id
+    combination.save(update_fields=['word1', 'word2'])
+
+
+def merge_entries(DictionaryEntry, WordCombination, Through, keep_id, duplicate_ids):
+    """Re-point every combination of the duplicate entries to keep_id and delete the duplicates."""
+    duplicate_ids = set(duplicate_ids)
+
+    combinations = WordCombination.objects.filter(Q(word1_id__in=duplicate_ids) | Q(word2_id__in=duplicate_ids))
+    for combination in combinations.order_by('id'):
+        repoint_combination(
+            WordCombination,
+            Through,
+            combination,
+            keep_id if combination.word1_id in duplicate_ids else combination.word1_id,
+            keep_id if combination.word2_id in duplicate_ids else combination.word2_id,
+        )
+
+    DictionaryEntry.objects.filter(id__in=duplicate_ids).delete()
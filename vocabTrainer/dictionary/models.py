@@ -1,12 +1,81 @@
+import unicodedata
+
+from django.conf import settings
 from django.db import models
 
+def canonical_language_pair(language1, language2):
+    """Return the language pair of a combination in sorted order, e.g. 'de-en'."""
+    return '-'.join(sorted((language1, language2)))
+
+# NFKC and case folding can lengthen a word, ß becomes ss and U+FDFA 18 characters. Longer keys
+# are cut to this length, which only words sharing their first 200 folded characters would notice.
+SEARCH_KEY_LENGTH = 200
+
+def search_key(word):
+    """
+    Return the normalized form of a word that lookups compare: NFKC, case folded, with runs of
+    whitespace collapsed and, with the DICTIONARY_FOLD_ACCENTS setting, without accents, cut
+    to SEARCH_KEY_LENGTH characters. 'Haus', 'haus' and 'HAUS' share the key 'haus'.
+    """
+    if word.isascii():
+        # NFKC leaves ASCII alone and casefold is lower
+        return ' '.join(word.lower().split())
+
+    key = unicodedata.normalize('NFKC', unicodedata.normalize('NFKC', word).casefold())
+    key = ' '.join(key.split())
+
+    if getattr(settings, 'DICTIONARY_FOLD_ACCENTS', False):
+        key = ''.join(char for char in unicodedata.normalize('NFD', key) if not unicodedata.combining(char))
+        key = unicodedata.normalize('NFC', key)
+
+    return key[:SEARCH_KEY_LENGTH]
+
 class DictionaryEntry(models.Model):
     word = models.CharField(max_length=100)
     language = models.CharField(max_length=50)
+    search_key = models.CharField(max_length=SEARCH_KEY_LENGTH, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['language', 'word'], name='dictionary_entry_unique_language_word')
+        ]
+        indexes = [
+            # The pattern operator classes let PostgreSQL use the index for LIKE 'prefix%' too.
+            models.Index(
+                fields=['search_key', 'language'],
+                name='dictionary_entry_key_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_key = search_key(self.word)
+        super().save(*args, **kwargs)
 
 class WordCombination(models.Model):
     word1 = models.ForeignKey(DictionaryEntry, related_name='word1_entries', on_delete=models.CASCADE)
     word2 = models.ForeignKey(DictionaryEntry, related_name='word2_entries', on_delete=models.CASCADE)
+    language_pair = models.CharField(max_length=101, blank=True, default='')
+    orphaned_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         unique_together = ('word1', 'word2')
+        constraints = [
+            models.CheckConstraint(condition=models.Q(word1__lt=models.F('word2')), name='word_combination_canonical_order')
+        ]
+        indexes = [
+            models.Index(fields=['language_pair', 'id'], name='word_combination_pair_id_idx'),
+            models.Index(
+                fields=['orphaned_at'],
+                condition=models.Q(orphaned_at__isnull=False),
+                name='word_combination_orphaned_idx'
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.word1_id and self.word2_id and self.word1_id > self.word2_id:
+            self.word1, self.word2 = self.word2, self.word1
+
+        self.language_pair = canonical_language_pair(self.word1.language, self.word2.language)
+
+        super().save(*args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Deferred removal of dictionary rows nothing refers to any more.
+
+Word combinations unlinked from their last collection are only marked with ``orphaned_at``,
+combinations created through the dictionary API never belong to a collection and stay. The
+sweeper deletes the marked combinations that are still unlinked and then every entry neither
+foreign key of a combination refers to, in chunks, one anti-join DELETE per table and chunk.
+It runs from the ``sweep_orphans`` management command or, with ``ORPHAN_SWEEP_INTERVAL`` set,
+in a background thread of every process.
+"""
+import logging
+import threading
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+from .graph import translation_graph
+from .models import DictionaryEntry, WordCombination
+from .search import entries_removed
+from vocabTrainer.cache import bump_table_versions
+
+logger = logging.getLogger(__name__)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def delete_unreferenced_entries(entry_ids=None, limit=None):
+    """
+    Delete dictionary entries that no word combination refers to through either foreign key.
+
+    Args:
+        entry_ids (list): Only consider these entries, all of them if None.
+        limit (int): The maximum number of entries to delete.
+
+    Returns:
+        list: The deleted DictionaryEntry instances.
+    """
+    entry_table = DictionaryEntry._meta.db_table
+    combination_table = WordCombination._meta.db_table
+    unreferenced = f"""
+        NOT EXISTS (SELECT 1 FROM {combination_table} c WHERE c.word1_id = {entry_table}.id)
+        AND NOT EXISTS (SELECT 1 FROM {combination_table} c WHERE c.word2_id = {entry_table}.id)
+    """
+
+    sql = f'SELECT id, word, language FROM {entry_table} WHERE {unreferenced}'
+    params = []
+    if entry_ids is not None:
+        if not entry_ids:
+            return []
+        sql += f' AND id IN ({_placeholders(entry_ids)})'
+        params.extend(entry_ids)
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        entries = [DictionaryEntry.from_db(connection.alias, ['id', 'word', 'language'], row) for row in cursor.fetchall()]
+        if not entries:
+            return []
+
+        # Checked again, a combination might have picked an entry up in the meantime.
+        ids = [entry.id for entry in entries]
+        cursor.execute(f'DELETE FROM {entry_table} WHERE id IN ({_placeholders(ids)}) AND {unreferenced}', ids)
+
+    bump_table_versions(DictionaryEntry)
+    return entries
+
+
+def delete_orphaned_combinations(limit):
+    """
+    Delete word combinations marked as orphaned that are still not part of any collection.
+
+    Returns:
+        list: The (word1 id, word2 id) pairs of the deleted combinations.
+    """
+    combination_table = WordCombination._meta.db_table
+    through = WordCombination.collections.through
+    through_table = through._meta.db_table
+    through_column = through._meta.get_field('wordcombination').column
+    orphaned = f"""
+        orphaned_at IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM {through_table} t WHERE t.{through_column} = {combination_table}.id)
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT id, word1_id, word2_id FROM {combination_table} WHERE {orphaned} LIMIT %s', [limit])
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+
+        ids = [row[0] for row in rows]
+        cursor.execute(f'DELETE FROM {combination_table} WHERE id IN ({_placeholders(ids)}) AND {orphaned}', ids)
+
+    bump_table_versions(WordCombination)
+
+    return [(word1_id, word2_id) for _, word1_id, word2_id in rows]
+
+
+def sweep_orphans(chunk_size=5000):
+    """
+    Delete orphaned word combinations and unreferenced dictionary entries, one short
+    transaction per chunk.
+
+    Args:
+        chunk_size (int): The number of rows deleted per statement.
+
+    Returns:
+        dict: The number of deleted 'combinations' and 'entries'.
+    """
+    # Combinations that were added to a collection again are no longer orphans.
+    WordCombination.objects.filter(orphaned_at__isnull=False, collections__isnull=False).update(orphaned_at=None)
+
+    deleted = {'combinations': 0, 'entries': 0}
+    for key, delete, forget in (
+        ('combinations', delete_orphaned_combinations, translation_graph.remove_combinations),
+        ('entries', lambda limit: delete_unreferenced_entries(limit=limit), entries_removed),
+    ):
+        while True:
+            try:
+                with transaction.atomic():
+                    rows = delete(chunk_size)
+            except IntegrityError:
+                logger.warning(f'Orphan sweep of {key} stopped by a concurrent write')
+                break
+
+            forget(rows)
+            deleted[key] += len(rows)
+            if len(rows) < chunk_size:
+                break
+
+    logger.info(f'Swept {deleted["combinations"]} orphaned word combinations and {deleted["entries"]} dictionary entries')
+    return deleted
+
+
+class OrphanSweeper(threading.Thread):
+    """Runs sweep_orphans every interval seconds until stopped."""
+
+    def __init__(self, interval, chunk_size=5000):
+        super().__init__(name='orphan-sweeper', daemon=True)
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                sweep_orphans(self.chunk_size)
+            except Exception:
+                logger.exception('Orphan sweep failed')
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
@@ -1,9 +1,19 @@
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Q
 from rest_framework import serializers
 
-from .exceptions import WordCombinationFormatException, WordCombinationAlreadyExistsException
-from .models import DictionaryEntry, WordCombination
+from .exceptions import (
+    BulkCreateException,
+    BulkDeleteException,
+    WordCombinationFormatException,
+    WordCombinationAlreadyExistsException
+)
+from .models import DictionaryEntry, WordCombination, canonical_language_pair, search_key
+from .graph import translation_graph
+from .orphans import delete_unreferenced_entries
+from .search import entries_added, entries_removed
+from .signals import combinations_changed
+from vocabTrainer.cache import bump_table_versions
 
 class DictionaryEntrySerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,12 +21,132 @@ class DictionaryEntrySerializer(serializers.ModelSerializer):
         fields = ['id', 'word', 'language']
 
 
-def _cleanup_dictionary_entry(old_entry, related_name):
+def _cleanup_dictionary_entries(entry_ids):
     """
-    Delete the dictionary entry if it is no longer linked to any word combinations.
+    Delete those of the dictionary entries that are no longer linked to any word combination
+    through either side, with one lookup and one delete however many entries are passed.
     """
-    if old_entry and getattr(old_entry, related_name).count() == 0:
-        old_entry.delete()
+    deleted = delete_unreferenced_entries(list({entry_id for entry_id in entry_ids if entry_id}))
+    if deleted:
+        transaction.on_commit(lambda: entries_removed(deleted))
+
+
+def _upsert_dictionary_entries(spellings):
+    """
+    Insert the missing entries and return all requested ones in a single statement.
+
+    Entries are matched on their search key, the existing entry with the requested spelling or
+    else the oldest one is returned. Only keys without any entry are inserted, with
+    INSERT ... ON CONFLICT DO NOTHING RETURNING on the (language, word) unique index.
+
+    Args:
+        spellings (list): The (language, word) tuples to resolve, one per search key, new
+            entries are inserted in this order.
+
+    Returns:
+        tuple: The DictionaryEntry instances that could be resolved and those of them that were inserted.
+    """
+    table = DictionaryEntry._meta.db_table
+    values = ', '.join(['(%s, %s, %s)'] * len(spellings))
+    params = [value for language, word in spellings for value in (language, word, search_key(word))]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH input (language, word, search_key) AS (VALUES {values}),
+            existing AS (
+                SELECT DISTINCT ON (t.language, t.search_key) t.id, t.word, t.language, t.search_key
+                FROM {table} t JOIN input i ON t.search_key = i.search_key AND t.language = i.language
+                ORDER BY t.language, t.search_key, t.word = i.word DESC, t.id
+            ),
+            inserted AS (
+                INSERT INTO {table} (language, word, search_key)
+                SELECT i.language, i.word, i.search_key FROM input i
+                WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.language = i.language AND e.search_key = i.search_key)
+                ON CONFLICT (language, word) DO NOTHING
+                RETURNING id, word, language, search_key
+            )
+            SELECT id, word, language, search_key, false FROM existing
+            UNION ALL
+            SELECT id, word, language, search_key, true FROM inserted
+        """, params)
+        rows = cursor.fetchall()
+
+    entries = [
+        (DictionaryEntry.from_db(connection.alias, ['id', 'word', 'language', 'search_key'], row[:4]), row[4])
+        for row in rows
+    ]
+    return [entry for entry, _ in entries], [entry for entry, inserted in entries if inserted]
+
+
+def _get_or_create_dictionary_entries(words):
+    """
+    Resolve many (language, word) pairs to dictionary entries with a constant number of queries.
+
+    Words are matched on their search key, so 'haus' resolves to an existing 'Haus' instead of
+    adding a near-duplicate. Of several entries sharing a key, e.g. 'Essen' and 'essen', the one
+    spelled as requested wins. A new combination therefore never adds a second spelling of a
+    word, that takes an update of a combination, see _get_or_create_update_entries.
+
+    On PostgreSQL this is a single upsert statement, other backends use a lookup, bulk_create
+    with ignore_conflicts and a lookup of the inserted rows.
+
+    Args:
+        words (iterable): The (language, word) tuples to resolve.
+
+    Returns:
+        dict: A mapping of (language, word) to the matching DictionaryEntry.
+    """
+    keys = {(language, word): (language, search_key(word)) for language, word in words}
+    if not keys:
+        return {}
+
+    # The first spelling of each key stands for the others.
+    spellings = {}
+    for key, normalized in keys.items():
+        spellings.setdefault(normalized, key)
+
+    def fetch(wanted):
+        """The existing entries of the wanted keys, preferring the requested spelling, then the oldest."""
+        found = {}
+        queryset = DictionaryEntry.objects.filter(
+            search_key__in={key for _, key in wanted},
+            language__in={language for language, _ in wanted}
+        ).order_by('id')
+        for entry in queryset:
+            normalized = (entry.language, entry.search_key)
+            if normalized in wanted and (normalized not in found or entry.word == spellings[normalized][1]):
+                found[normalized] = entry
+        return found
+
+    if connection.vendor == 'postgresql':
+        resolved, created = _upsert_dictionary_entries(list(spellings.values()))
+        entries = {(entry.language, entry.search_key): entry for entry in resolved}
+    else:
+        entries = fetch(spellings)
+        created = []
+        # Created in the order given, ids decide the order of the words in a combination.
+        missing = [spelling for normalized, spelling in spellings.items() if normalized not in entries]
+        if missing:
+            DictionaryEntry.objects.bulk_create(
+                [DictionaryEntry(language=language, word=word, search_key=search_key(word)) for language, word in missing],
+                ignore_conflicts=True
+            )
+
+    missing = spellings.keys() - entries.keys()
+    if missing:
+        # Inserted above, or on PostgreSQL committed by a concurrent transaction after our
+        # statement started and not visible to the upsert, but they exist now.
+        found = fetch(missing)
+        entries.update(found)
+        if connection.vendor != 'postgresql':
+            created = list(found.values())
+
+    # Existing entries change neither the cached responses nor the search indexes.
+    if created:
+        transaction.on_commit(lambda: entries_added(created))
+        # Inserted without signals
+        bump_table_versions(DictionaryEntry)
+    return {key: entries[normalized] for key, normalized in keys.items() if normalized in entries}
 
 
 def _get_or_create_dictionary_entry(validated_data, ignore_existing=False):
@@ -37,27 +167,205 @@ def _get_or_create_dictionary_entry(validated_data, ignore_existing=False):
     if len(words_data) != 2:
         raise WordCombinationFormatException()
 
-    word_entries = []
-    for key, value in words_data.items():
-        word_entry, _ = DictionaryEntry.objects.get_or_create(language=key, word=value)
-        word_entries.append(word_entry)
-
+    entries = _get_or_create_dictionary_entries(words_data.items())
+    word1_entry, word2_entry = sorted((entries[key] for key in words_data.items()), key=lambda word: word.id)
 
     if not ignore_existing:
-        existing_combination = WordCombination.objects.filter(
-            (Q(word1=word_entries[0]) & Q(word2=word_entries[1])) |
-            (Q(word1=word_entries[1]) & Q(word2=word_entries[0]))
-        ).first()
+        existing_combination = WordCombination.objects.filter(word1=word1_entry, word2=word2_entry).first()
 
         if existing_combination:
             raise WordCombinationAlreadyExistsException(combination_id=existing_combination.id)
 
-    return sorted([word_entries[0], word_entries[1]], key=lambda word: word.id)
+    return word1_entry, word2_entry
+
+def _get_or_create_update_entries(instance, words_data):
+    """
+    Resolve the words of an update of a word combination to dictionary entries.
+
+    A word spelled exactly like an existing entry gets that entry. A word sharing its search key
+    with the entry it replaces corrects the spelling, e.g. haus to Haus: the entry is renamed if
+    the combination is its only user, otherwise an entry with the new spelling is created. Other
+    words are resolved by their search key like the words of new combinations.
+
+    Args:
+        instance (WordCombination): The word combination being updated.
+        words_data (dict): The language-keyed new words.
+
+    Returns:
+        list: The two DictionaryEntry instances, in the order of words_data.
+    """
+    words = list(words_data.items())
+    replaced = {entry.language: entry for entry in (instance.word1, instance.word2)}
+
+    exact = Q()
+    for language, word in words:
+        exact |= Q(language=language, word=word)
+    entries = {(entry.language, entry.word): entry for entry in DictionaryEntry.objects.filter(exact)}
+
+    by_key = []
+    for language, word in words:
+        if (language, word) in entries:
+            continue
+        old_entry = replaced.get(language)
+        if old_entry is None or old_entry.search_key != search_key(word):
+            by_key.append((language, word))
+            continue
+
+        shared = WordCombination.objects.filter(Q(word1=old_entry) | Q(word2=old_entry)).exclude(pk=instance.pk)
+        if shared.exists():
+            entry = DictionaryEntry.objects.create(language=language, word=word)
+            transaction.on_commit(lambda entry=entry: entries_added([entry]))
+        else:
+            previous = DictionaryEntry(id=old_entry.id, language=language, word=old_entry.word)
+            entry = old_entry
+            entry.word = word
+            entry.save(update_fields=['word', 'search_key'])
+            transaction.on_commit(lambda previous=previous, entry=entry: (entries_removed([previous]), entries_added([entry])))
+        entries[(language, word)] = entry
+
+    entries.update(_get_or_create_dictionary_entries(by_key))
+    return [entries[key] for key in words]
+
+def _validate_words(words_data):
+    """
+    Check a raw ``words`` dict. The bulk paths call this through _clean_words, the serializers
+    through _check_words, so single and bulk writes accept the same words.
+
+    Args:
+        words_data: The language-keyed words of a single combination.
+
+    Returns:
+        str: A description of the problem, or None if the words are valid.
+    """
+    if not isinstance(words_data, dict) or len(words_data) != 2:
+        return "Wort-Kombination hat eine falsche Struktur."
+
+    max_word_length = DictionaryEntry._meta.get_field('word').max_length
+    max_language_length = DictionaryEntry._meta.get_field('language').max_length
+    for language, word in words_data.items():
+        if not isinstance(word, str) or not word.strip():
+            return "Beide Wörter sind erforderlich."
+        if len(language) > max_language_length or len(word.strip()) > max_word_length:
+            return "Wort oder Sprache ist zu lang."
+
+    return None
+
+
+def _clean_words(words_data):
+    """
+    Validate a raw ``words`` dict and strip its words, as the CharField of the serializers does,
+    so bulk writes store the same words as single ones.
+
+    Args:
+        words_data: The language-keyed words of a single combination.
+
+    Returns:
+        tuple: The cleaned words, or None, and a description of the problem, or None.
+    """
+    error = _validate_words(words_data)
+    if error:
+        return None, error
+    return {language: word.strip() for language, word in words_data.items()}, None
+
+
+def _check_words(words_data):
+    """
+    Validator of the ``words`` field of the serializers, see _validate_words.
+
+    Raises:
+        WordCombinationFormatException: If the words are invalid.
+    """
+    error = _validate_words(words_data)
+    if error:
+        raise WordCombinationFormatException(error)
+    return words_data
+
+
+BULK_CREATE_LIMIT = 1000
+
+@transaction.atomic
+def _bulk_create_combinations(items, limit=BULK_CREATE_LIMIT):
+    """
+    Create many word combinations at once using set-based queries.
+
+    The number of queries does not depend on the number of items: all dictionary
+    entries are resolved with one lookup plus one insert, existing combinations
+    are found with one lookup and all new combinations are inserted together.
+
+    Args:
+        items (list): The posted items, each of the form {'words': {language: word}}.
+        limit (int): The maximum number of items, None for no limit.
+
+    Returns:
+        dict: The 'created', 'existing' and 'invalid' items, each tagged with its index.
+
+    Raises:
+        BulkCreateException: If items is not a list or longer than limit.
+    """
+    if not isinstance(items, list) or (limit is not None and len(items) > limit):
+        raise BulkCreateException()
+
+    result = {'created': [], 'existing': [], 'invalid': []}
+
+    valid = []
+    for index, item in enumerate(items):
+        words_data, error = _clean_words(item.get('words') if isinstance(item, dict) else None)
+
+        if error:
+            result['invalid'].append({'index': index, 'detail': error})
+        else:
+            valid.append((index, list(words_data.items())))
+
+    entries = _get_or_create_dictionary_entries(
+        pair for _, words_data in valid for pair in words_data
+    )
+    entry_ids = {entry.id for entry in entries.values()}
+
+    existing = {
+        (combination.word1_id, combination.word2_id): combination
+        for combination in WordCombination.objects.filter(word1_id__in=entry_ids, word2_id__in=entry_ids)
+    }
+
+    pending = {}
+    for index, words_data in valid:
+        word1_entry, word2_entry = sorted((entries[pair] for pair in words_data), key=lambda word: word.id)
+        key = (word1_entry.id, word2_entry.id)
+
+        if key in existing:
+            result['existing'].append({'index': index, 'id': existing[key].id})
+        elif key in pending:
+            pending[key][1].append(index)
+        else:
+            combination = WordCombination(
+                word1=word1_entry,
+                word2=word2_entry,
+                language_pair=canonical_language_pair(word1_entry.language, word2_entry.language)
+            )
+            pending[key] = (combination, [index])
+
+    try:
+        WordCombination.objects.bulk_create([combination for combination, _ in pending.values()])
+    except IntegrityError:
+        raise WordCombinationAlreadyExistsException()
+
+    for combination, indexes in pending.values():
+        result['created'].append({'index': indexes[0], **get_representation(combination)})
+        for index in indexes[1:]:
+            result['existing'].append({'index': index, 'id': combination.id})
+
+    created = [combination for combination, _ in pending.values()]
+    transaction.on_commit(lambda: translation_graph.add_combinations(created))
+    if created:
+        bump_table_versions(WordCombination)
+
+    result['existing'].sort(key=lambda item: item['index'])
+    return result
 
 @transaction.atomic
 def _update_combination(instance, validated_data, ignore_existing=False):
     """
-    Update an existing word combination with new entries or link existing ones.
+    Update an existing word combination with new entries or link existing ones, see
+    _get_or_create_update_entries for how the words are resolved.
 
     Args:
         instance (WordCombination): The existing word combination instance to update.
@@ -68,7 +376,22 @@ def _update_combination(instance, validated_data, ignore_existing=False):
     """
     old_word1_entry = instance.word1
     old_word2_entry = instance.word2
-    new_word1_entry, new_word2_entry = _get_or_create_dictionary_entry(validated_data, ignore_existing)
+    old_pair = (old_word1_entry.id, old_word2_entry.id)
+
+    words_data = validated_data.pop('words')
+    if len(words_data) != 2:
+        raise WordCombinationFormatException()
+
+    entries = _get_or_create_update_entries(instance, words_data)
+    new_word1_entry, new_word2_entry = sorted(entries, key=lambda word: word.id)
+
+    if not ignore_existing:
+        existing_combination = WordCombination.objects.filter(
+            word1=new_word1_entry, word2=new_word2_entry
+        ).exclude(pk=instance.pk).first()
+
+        if existing_combination:
+            raise WordCombinationAlreadyExistsException(combination_id=existing_combination.id)
 
     instance.word1 = new_word1_entry
     instance.word2 = new_word2_entry
@@ -76,11 +399,15 @@ def _update_combination(instance, validated_data, ignore_existing=False):
     try:
         instance.save()
 
-        _cleanup_dictionary_entry(old_word1_entry, 'word1_entries')
-        _cleanup_dictionary_entry(old_word2_entry, 'word2_entries')
+        _cleanup_dictionary_entries([old_word1_entry.id, old_word2_entry.id])
     except IntegrityError as e:
         raise WordCombinationAlreadyExistsException()
 
+    combinations_changed.send(sender=WordCombination, updated=[instance.id], deleted=[])
+
+    transaction.on_commit(lambda: translation_graph.remove_combinations([old_pair]))
+    transaction.on_commit(lambda: translation_graph.add_combinations([instance]))
+
     return instance
 
 @transaction.atomic
@@ -102,12 +429,14 @@ def _create_combination(validated_data, ignore_existing=False):
     try:
         if ignore_existing:
             combination, _ = WordCombination.objects.get_or_create(word1=word1_entry, word2=word2_entry)
-            return combination
-
-        return WordCombination.objects.create(word1=word1_entry, word2=word2_entry)
+        else:
+            combination = WordCombination.objects.create(word1=word1_entry, word2=word2_entry)
     except IntegrityError:
         raise WordCombinationAlreadyExistsException()
 
+    transaction.on_commit(lambda: translation_graph.add_combinations([combination]))
+    return combination
+
 @transaction.atomic
 def _delete_combination(instance):
     """
@@ -121,36 +450,110 @@ def _delete_combination(instance):
     """
     word1_entry = instance.word1
     word2_entry = instance.word2
+    pair = (word1_entry.id, word2_entry.id)
+
+    combinations_changed.send(sender=WordCombination, updated=[], deleted=[instance.id])
 
     try:
         instance.delete()
 
-        _cleanup_dictionary_entry(word1_entry, 'word1_entries')
-        _cleanup_dictionary_entry(word2_entry, 'word2_entries')
+        _cleanup_dictionary_entries([word1_entry.id, word2_entry.id])
     except IntegrityError:
         raise WordCombinationAlreadyExistsException()
 
+    transaction.on_commit(lambda: translation_graph.remove_combinations([pair]))
+
+BULK_DELETE_LIMIT = 1000
+
+def _split_ids(values):
+    """
+    Separate the valid ids of a bulk delete from the invalid items.
+
+    Args:
+        values (list): The posted ids.
+
+    Returns:
+        tuple: The unique valid ids in posted order and the 'invalid' items tagged with their index.
+
+    Raises:
+        BulkDeleteException: If values is not a list or longer than BULK_DELETE_LIMIT.
+    """
+    if not isinstance(values, list) or len(values) > BULK_DELETE_LIMIT:
+        raise BulkDeleteException()
+
+    ids, invalid = {}, []
+    for index, value in enumerate(values):
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            ids[value] = None
+        else:
+            invalid.append({'index': index, 'detail': "Ungültige ID."})
+
+    return list(ids), invalid
+
+@transaction.atomic
+def _bulk_delete_combinations(values):
+    """
+    Delete many word combinations and their dictionary entries that are left unreferenced.
+
+    Runs a fixed number of statements however many ids are passed: one lookup, one delete
+    of the collection links, one delete of the combinations and the set-based entry cleanup.
+
+    Args:
+        values (list): The ids of the word combinations to delete.
+
+    Returns:
+        dict: The 'deleted' and 'not_found' ids and the 'invalid' items tagged with their index.
+    """
+    ids, invalid = _split_ids(values)
+
+    rows = list(WordCombination.objects.filter(id__in=ids).values_list('id', 'word1_id', 'word2_id'))
+    found = {combination_id for combination_id, _, _ in rows}
+    result = {
+        'deleted': [combination_id for combination_id in ids if combination_id in found],
+        'not_found': [combination_id for combination_id in ids if combination_id not in found],
+        'invalid': invalid,
+    }
+    if not rows:
+        return result
+
+    combinations_changed.send(sender=WordCombination, updated=[], deleted=result['deleted'])
+
+    through = WordCombination.collections.through
+    through_column = through._meta.get_field('wordcombination').column
+    placeholders = ', '.join(['%s'] * len(result['deleted']))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {through._meta.db_table} WHERE {through_column} IN ({placeholders})', result['deleted']
+        )
+        cursor.execute(f'DELETE FROM {WordCombination._meta.db_table} WHERE id IN ({placeholders})', result['deleted'])
+    # Deleted without signals
+    bump_table_versions(WordCombination, through)
+
+    _cleanup_dictionary_entries(entry_id for _, word1_id, word2_id in rows for entry_id in (word1_id, word2_id))
+
+    pairs = [(word1_id, word2_id) for _, word1_id, word2_id in rows]
+    transaction.on_commit(lambda: translation_graph.remove_combinations(pairs))
+    return result
+
 def get_representation(instance):
     """
     Helper function to customize the representation of a word combination
     using languages as keys.
 
+    The dict is built from the entries directly, so querysets should use
+    select_related('word1', 'word2') to avoid two lazy loads per row.
+
     Args:
         instance (WordCombination): The word combination instance to represent.
 
     Returns:
         dict: The serialized representation with languages as keys.
     """
-    word1_data = DictionaryEntrySerializer(instance.word1).data
-    word2_data = DictionaryEntrySerializer(instance.word2).data
-
-    language_key_1 = word1_data["language"]
-    language_key_2 = word2_data["language"]
-
     return {
         "id": instance.id,
-        language_key_1: word1_data["word"],
-        language_key_2: word2_data["word"]
+        instance.word1.language: instance.word1.word,
+        instance.word2.language: instance.word2.word
     }
 
 class WordCombinationSerializer(serializers.ModelSerializer):
@@ -160,6 +563,9 @@ class WordCombinationSerializer(serializers.ModelSerializer):
         model = WordCombination
         fields = ['id', 'words']
 
+    def validate_words(self, value):
+        return _check_words(value)
+
     def create(self, validated_data):
         return _create_combination(validated_data)
 
@@ -173,6 +579,9 @@ class WordCombinationDetailSerializer(serializers.ModelSerializer):
         model = WordCombination
         fields = ['id', 'words']
 
+    def validate_words(self, value):
+        return _check_words(value)
+
     def update(self, instance, validated_data):
         return _update_combination(instance, validated_data)
 
@@ -0,0 +1,11 @@
+"""
+Signals sent by the write helpers in ``dictionary.serializers``.
+
+The dictionary does not know the collections its word combinations belong to, apps that keep
+per-collection state, like the change log of ``collection.changes``, connect to these instead.
+"""
+from django.dispatch import Signal
+
+# Sent with updated and deleted, lists of word combination ids. Deletions are sent before the
+# rows are deleted, so receivers can still follow their relations. Sent inside the transaction.
+combinations_changed = Signal()
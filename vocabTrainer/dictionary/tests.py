@@ -1,16 +1,35 @@
-from django.db import IntegrityError
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Q
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 
-from .models import DictionaryEntry, WordCombination
+from .models import DictionaryEntry, WordCombination, search_key
+from .fuzzy import fuzzy_search, levenshtein
+from .graph import TranslationGraph, translation_graph
+from .search import prefix_index
+from vocabTrainer.cache import bump_table_versions, table_versions
 
 User = get_user_model()
 
 class DictionaryAPIEndpointsTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create_user(username='testuser', password='testpassword')
         self.token = AccessToken.for_user(self.user)
@@ -50,6 +69,305 @@ class DictionaryAPIEndpointsTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
+    def test_dictionary_entry_unique_language_word(self):
+        with self.assertRaises(IntegrityError):
+            DictionaryEntry.objects.create(word='hello', language='en')
+
+    def test_word_combination_is_stored_in_canonical_order(self):
+        combination = WordCombination.objects.create(word1=self.word_entry4, word2=self.word_entry1)
+
+        combination.refresh_from_db()
+        self.assertEqual((combination.word1, combination.word2), (self.word_entry1, self.word_entry4))
+
+    def test_table_versions_do_not_expire(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        backends = {
+            'django.core.cache.backends.locmem.LocMemCache': 'versions',
+            'django.core.cache.backends.filebased.FileBasedCache': location,
+        }
+
+        for backend, backend_location in backends.items():
+            with self.subTest(backend=backend), \
+                    override_settings(CACHES={'default': {'BACKEND': backend, 'LOCATION': backend_location, 'TIMEOUT': 300}}):
+                table_versions(DictionaryEntry)
+                with self.captureOnCommitCallbacks(execute=True):
+                    bump_table_versions(DictionaryEntry)
+                version = table_versions(DictionaryEntry)
+
+                with mock.patch('time.time', return_value=time.time() + 86400):
+                    self.assertEqual(table_versions(DictionaryEntry), version)
+
+    def test_list_word_combinations_is_cached_until_a_write(self):
+        response = self.client.get(reverse('word_combination'), {'lang': 'en-es'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        # user lookup only
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('word_combination'), {'lang': 'en-es'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('word_combination'), {'words': {'en': 'world', 'es': 'mundo'}}, format='json')
+
+        response = self.client.get(reverse('word_combination'), {'lang': 'en-es'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 3)
+
+    def test_list_word_combinations_not_modified(self):
+        response = self.client.get(reverse('word_combination'), {'lang': 'en-es'})
+
+        response = self.client.get(reverse('word_combination'), {'lang': 'en-es'}, HTTP_IF_NONE_MATCH=f'W/{response["ETag"]}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse('word_combination'), {'lang': 'es-en'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_export_word_combinations(self):
+        response = self.client.get(reverse('word_combination_export'), {'lang': 'es-en', 'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'id': combination.id, 'en': combination.word1.word, 'es': combination.word2.word}
+            for combination in WordCombination.objects.filter(language_pair='en-es').order_by('id')
+        ])
+
+        response = self.client.get(reverse('word_combination_export'), {'format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,language1,word1,language2,word2')
+        self.assertEqual(len(lines), 1 + WordCombination.objects.count())
+
+    def test_snapshot_with_delta(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+
+        with override_settings(DICTIONARY_SNAPSHOT_ROOT=root):
+            call_command('build_snapshots', 'es-en', stdout=open(os.devnull, 'w'))
+            old = self.client.get(reverse('dictionary_snapshot', args=['es-en'])).data
+            old_copy = os.path.join(root, 'old.sqlite')
+            shutil.copy(os.path.join(root, 'en-es', f'{old["version"]}.sqlite'), old_copy)
+
+            self.client.post(reverse('word_combination'), {'words': {'en': 'world', 'es': 'mundo'}}, format='json')
+            self.client.delete(reverse('word_combination_detail', args=[self.word_combination.id]))
+            call_command('build_snapshots', stdout=open(os.devnull, 'w'))
+
+            response = self.client.get(reverse('dictionary_snapshot', args=['en-es']), {'since': old['version']})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response.data['version'], old['version'])
+            self.assertEqual(response.data['combinations'], 2)
+            delta_url = response.data['delta']['download']
+
+            response = self.client.get(delta_url)
+            delta_path = os.path.join(root, 'delta.sqlite')
+            with open(delta_path, 'wb') as file:
+                file.write(b''.join(response.streaming_content))
+
+        database = sqlite3.connect(old_copy)
+        database.execute('ATTACH DATABASE ? AS d', [delta_path])
+        database.execute('DELETE FROM combinations WHERE id IN (SELECT id FROM d.deletes UNION ALL SELECT id FROM d.upserts)')
+        database.execute('INSERT INTO combinations SELECT id, word1, word2 FROM d.upserts')
+        rows = database.execute('SELECT id, word1, word2 FROM combinations ORDER BY id').fetchall()
+        database.close()
+
+        self.assertEqual(rows, [
+            (combination.id, combination.word1.word, combination.word2.word)
+            for combination in WordCombination.objects.filter(language_pair='en-es').order_by('id')
+        ])
+
+    def test_snapshot_download_range(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+
+        with override_settings(DICTIONARY_SNAPSHOT_ROOT=root):
+            call_command('build_snapshots', 'en-es', stdout=open(os.devnull, 'w'))
+            snapshot = self.client.get(reverse('dictionary_snapshot', args=['en-es'])).data
+
+            response = self.client.get(snapshot['download'], HTTP_RANGE='bytes=0-15')
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(b''.join(response.streaming_content), b'SQLite format 3\x00')
+            self.assertEqual(response['Content-Range'], f'bytes 0-15/{snapshot["size"]}')
+
+            response = self.client.get(snapshot['download'], HTTP_RANGE=f'bytes={snapshot["size"]}-')
+            self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+            response = self.client.get(reverse('dictionary_snapshot_download', args=['en-es', 'manifest.json']))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_dictionary_entries_by_prefix(self):
+        prefix_index.clear()
+        DictionaryEntry.objects.create(word='help', language='en')
+
+        response = self.client.get(reverse('dictionary_search'), {'lang': 'en', 'prefix': 'hel'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['word'] for item in response.data], ['hello', 'help'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('word_combination'), {'words': {'en': 'helmet', 'de': 'Helm'}}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('word_combination_detail', args=[self.word_combination.id]))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dictionary_search'), {'lang': 'en', 'prefix': 'hel', 'limit': 5})
+        self.assertEqual([item['word'] for item in response.data], ['helmet', 'help'])
+
+    def test_search_dictionary_entries_ignores_case(self):
+        prefix_index.clear()
+        DictionaryEntry.objects.create(word='Helsinki', language='en')
+
+        response = self.client.get(reverse('dictionary_search'), {'lang': 'en', 'prefix': 'HEL'})
+        self.assertEqual([item['word'] for item in response.data], ['hello', 'Helsinki'])
+
+        response = self.client.get(reverse('dictionary_entry'), {'lang': 'en', 'word': 'HeLLo'})
+        self.assertEqual([item['id'] for item in response.data], [self.word_entry1.id])
+
+    def test_search_key(self):
+        self.assertEqual(search_key('  Straße  am\tSee '), 'strasse am see')
+        self.assertEqual(search_key('ＨＡＵＳ'), 'haus')
+        self.assertEqual(search_key('Café'), 'café')
+        with override_settings(DICTIONARY_FOLD_ACCENTS=True):
+            self.assertEqual(search_key('Café'), 'cafe')
+        # NFKC expands U+FDFA to 18 characters, the key stays within its column.
+        self.assertEqual(len(search_key('\ufdfa' * 100)), DictionaryEntry._meta.get_field('search_key').max_length)
+
+    def test_create_word_combination_reuses_near_duplicate_entry(self):
+        response = self.client.post(reverse('word_combination'), {'words': {'en': 'HELLO', 'de': 'Hallo'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['en'], 'hello')
+
+        response = self.client.post(reverse('word_combination'), [
+            {'words': {'en': 'House', 'de': 'Haus'}},
+            {'words': {'en': 'house', 'fr': 'maison'}},
+        ], format='json')
+        self.assertEqual([item['en'] for item in response.data['created']], ['House', 'House'])
+        self.assertEqual(DictionaryEntry.objects.filter(language='en', search_key__in=['hello', 'house']).count(), 2)
+
+    def test_search_dictionary_entries_without_prefix(self):
+        response = self.client.get(reverse('dictionary_search'), {'lang': 'en'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fuzzy_search_dictionary_entries(self):
+        prefix_index.clear()
+
+        response = self.client.get(reverse('dictionary_fuzzy_search'), {'lang': 'es', 'q': 'holla', 'max_distance': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(item['word'], item['distance']) for item in response.data], [('hola', 1)])
+        self.assertEqual(
+            [item['id'] for item in response.data[0]['combinations']],
+            list(WordCombination.objects.filter(Q(word1=self.word_entry3) | Q(word2=self.word_entry3)).order_by('id').values_list('id', flat=True))
+        )
+
+    def test_fuzzy_search_accepts_word_alias(self):
+        prefix_index.clear()
+
+        response = self.client.get(reverse('dictionary_fuzzy_search'), {'lang': 'es', 'word': 'holla'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['word'] for item in response.data], ['hola'])
+
+        response = self.client.get(reverse('dictionary_fuzzy_search'), {'lang': 'es'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_of_one_language_does_not_wait_for_another(self):
+        prefix_index.clear()
+        prefix_index.search('es', 'ho')
+        _, _, lock = prefix_index.indexes['es']
+
+        with lock:
+            self.assertEqual(prefix_index.search('en', 'hel'), [('hello', self.word_entry1.id)])
+            prefix_index.remove_entries([self.word_entry2])
+            self.assertEqual(prefix_index.search('en', 'wor'), [])
+
+    def test_fuzzy_search_matches_linear_scan(self):
+        words = sorted(['hola', 'hole', 'holla', 'mundo', 'mano', 'mono', 'casa', 'cosa', 'caso', 'hola!', 'a', 'zz'])
+        ids = list(range(len(words)))
+
+        for query in ('hola', 'mana', 'cas', 'xyz', 'z'):
+            expected = sorted(
+                (levenshtein(query, word), word, ids[words.index(word)])
+                for word in words
+                if levenshtein(query, word) <= 2
+            )
+            self.assertEqual(fuzzy_search(words, ids, query, 2, 100), expected)
+
+    def test_translate_through_other_language(self):
+        translation_graph.clear()
+        salut = DictionaryEntry.objects.create(word='salut', language='fr')
+        WordCombination.objects.create(word1=self.word_entry3, word2=salut)
+
+        params = {'word': 'hello', 'from': 'en', 'to': 'fr'}
+        response = self.client.get(reverse('dictionary_translate'), {**params, 'max_hops': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+        response = self.client.get(reverse('dictionary_translate'), params)
+        self.assertEqual(response.data, [{
+            'id': salut.id, 'word': 'salut', 'language': 'fr', 'hops': 2,
+            'via': [{'id': self.word_entry3.id, 'word': 'hola', 'language': 'es'}]
+        }])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('word_combination'), {'words': {'en': 'hello', 'fr': 'bonjour'}}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('word_combination_detail', args=[self.word_combination.id]))
+
+        # user lookup, start entry and result entries, the graph is not reloaded
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dictionary_translate'), params)
+        self.assertEqual([(item['word'], item['hops']) for item in response.data], [('bonjour', 1)])
+
+    def test_translate_without_target_language(self):
+        response = self.client.get(reverse('dictionary_translate'), {'word': 'hello', 'from': 'en'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_translation_graph_compacts_overlay(self):
+        graph = TranslationGraph([(1, 'en'), (2, 'de'), (3, 'fr')], [(1, 2), (2, 3)])
+        graph.COMPACT_THRESHOLD = 2
+
+        graph.discard(2, 3)
+        graph.add(1, 'en', 4, 'fr')
+        self.assertTrue(graph.needs_compaction())
+
+        compacted = graph.compacted(graph.overlay())
+        self.assertEqual(compacted.overlay_size, 0)
+        self.assertEqual(sorted(compacted.edges()), [(1, 2), (1, 4)])
+        self.assertEqual(compacted.translate([2], 'fr', 2), [(2, 4, [1])])
+        self.assertEqual(graph.overlay_size, 2)
+
+    def test_translation_graph_compacts_in_background(self):
+        translation_graph.clear()
+        translation_graph.get()
+        salut = DictionaryEntry.objects.create(word='salut', language='fr')
+        monde = DictionaryEntry.objects.create(word='monde', language='fr')
+        compacted = TranslationGraph.compacted
+        started = threading.Event()
+
+        def compact_while_writing(graph, overlay):
+            started.wait()
+            # Runs without the lock, a write made meanwhile must survive the swap.
+            translation_graph.add_combinations([WordCombination(word1=self.word_entry4, word2=monde)])
+            return compacted(graph, overlay)
+
+        with mock.patch.object(TranslationGraph, 'COMPACT_THRESHOLD', 1), \
+                mock.patch.object(TranslationGraph, 'compacted', compact_while_writing):
+            translation_graph.add_combinations([WordCombination(word1=self.word_entry1, word2=salut)])
+            compaction = translation_graph.compaction
+            started.set()
+            compaction.join()
+
+        graph = translation_graph.get()
+        self.assertEqual(graph.overlay_size, 1)
+        row = graph.row(self.word_entry1.id)
+        self.assertIn(salut.id, graph.neighbors[graph.offsets[row]:graph.offsets[row + 1]])
+        self.assertIn(monde.id, graph.neighbors_of(self.word_entry4.id))
+        self.assertIsNone(translation_graph.compaction)
+
+    def test_translate_ignores_case_of_word(self):
+        translation_graph.clear()
+        response = self.client.get(reverse('dictionary_translate'), {'word': 'HELLO', 'from': 'en', 'to': 'es'})
+        self.assertEqual([item['word'] for item in response.data], ['hola'])
+
     def test_create_word_combination_with_existing_entries(self):
         data = {
             'words': {
@@ -107,6 +425,102 @@ class DictionaryAPIEndpointsTestCase(APITestCase):
         response = self.client.post(reverse('word_combination'), data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_bulk_create_word_combinations(self):
+        data = [
+            {'words': {'en': 'hello', 'es': 'hola'}},
+            {'words': {'en': 'house', 'de': 'Haus'}},
+            {'words': {'en': 'hello'}},
+            {'words': {'de': 'Haus', 'en': 'house'}},
+        ]
+        response = self.client.post(reverse('word_combination'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual([item['index'] for item in response.data['created']], [1])
+        self.assertEqual(response.data['created'][0]['de'], 'Haus')
+        self.assertEqual(response.data['existing'], [
+            {'index': 0, 'id': self.word_combination.id},
+            {'index': 3, 'id': response.data['created'][0]['id']},
+        ])
+        self.assertEqual([item['index'] for item in response.data['invalid']], [2])
+        self.assertEqual(WordCombination.objects.count(), 4)
+        self.assertEqual(DictionaryEntry.objects.filter(word='hello').count(), 1)
+
+    def test_bulk_create_strips_words(self):
+        DictionaryEntry.objects.create(word='Haus', language='de')
+
+        response = self.client.post(reverse('word_combination'), [{'words': {'en': ' house ', 'de': ' Haus '}}], format='json')
+        self.assertEqual((response.data['created'][0]['en'], response.data['created'][0]['de']), ('house', 'Haus'))
+        self.assertEqual(DictionaryEntry.objects.filter(language='de').count(), 1)
+
+    def test_bulk_create_word_combinations_limit(self):
+        data = [{'words': {'en': f'word{i}', 'de': f'Wort{i}'}} for i in range(1001)]
+        response = self.client.post(reverse('word_combination'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(WordCombination.objects.count(), 3)
+
+    def test_create_word_combination_validated_like_bulk_create(self):
+        data = {'words': {'en': 'x' * 150, 'de': 'Haus'}}
+        response = self.client.post(reverse('word_combination'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse('word_combination'), [data], format='json')
+        self.assertEqual([item['index'] for item in response.data['invalid']], [0])
+        self.assertFalse(DictionaryEntry.objects.filter(language='de').exists())
+
+    def test_bulk_create_existing_entries_keep_table_version(self):
+        version = table_versions(DictionaryEntry)
+        data = [{'words': {'en': 'world', 'es': 'mundo'}}]
+        with mock.patch('dictionary.serializers.entries_added') as entries_added:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('word_combination'), data, format='json')
+
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual(table_versions(DictionaryEntry), version)
+        entries_added.assert_not_called()
+
+    def test_bulk_create_word_combinations_constant_query_count(self):
+        small = [{'words': {'en': f'small{i}', 'de': f'klein{i}'}} for i in range(2)]
+        large = [{'words': {'en': f'large{i}', 'de': f'gross{i}'}} for i in range(50)]
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(reverse('word_combination'), small, format='json')
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.client.post(reverse('word_combination'), large, format='json')
+
+        self.assertEqual(len(response.data['created']), 50)
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_bulk_delete_word_combinations(self):
+        data = [self.word_combination.id, 0, 'x', self.word_combination2.id, 999]
+        response = self.client.delete(reverse('word_combination'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data['deleted'], [self.word_combination.id, self.word_combination2.id])
+        self.assertEqual(response.data['not_found'], [999])
+        self.assertEqual([item['index'] for item in response.data['invalid']], [1, 2])
+        self.assertEqual(WordCombination.objects.count(), 1)
+        # hola is still used by the remaining combination
+        self.assertEqual(set(DictionaryEntry.objects.values_list('word', flat=True)), {'world', 'hola'})
+
+        response = self.client.delete(reverse('word_combination'), {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_word_combinations_constant_query_count(self):
+        small = self.client.post(reverse('word_combination'), [
+            {'words': {'en': f'small{i}', 'de': f'klein{i}'}} for i in range(2)
+        ], format='json').data['created']
+        large = self.client.post(reverse('word_combination'), [
+            {'words': {'en': f'large{i}', 'de': f'gross{i}'}} for i in range(50)
+        ], format='json').data['created']
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.delete(reverse('word_combination'), [item['id'] for item in small], format='json')
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.client.delete(reverse('word_combination'), [item['id'] for item in large], format='json')
+
+        self.assertEqual(len(response.data['deleted']), 50)
+        self.assertEqual(len(small_queries), len(large_queries))
+
     def test_list_word_combinations(self):
         WordCombination.objects.create(word1=self.word_entry1, word2=self.word_entry2)
         response = self.client.get(reverse('word_combination'))
@@ -126,6 +540,52 @@ class DictionaryAPIEndpointsTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_language_pair_is_kept_in_sync(self):
+        self.assertEqual(self.word_combination.language_pair, 'en-es')
+
+        data = {'words': {'fr': 'bonjour', 'de': 'hallo'}}
+        self.client.put(reverse('word_combination_detail', args=[self.word_combination.id]), data, format='json')
+        self.word_combination.refresh_from_db()
+        self.assertEqual(self.word_combination.language_pair, 'de-fr')
+
+        self.client.post(reverse('word_combination'), [{'words': {'fr': 'maison', 'de': 'Haus'}}], format='json')
+        response = self.client.get(reverse('word_combination'), {'lang': 'fr-de'})
+        self.assertEqual(len(response.data), 2)
+
+    def test_list_endpoints_use_fixed_number_of_queries(self):
+        for i in range(20):
+            WordCombination.objects.create(
+                word1=DictionaryEntry.objects.create(word=f'word{i}', language='en'),
+                word2=DictionaryEntry.objects.create(word=f'palabra{i}', language='es')
+            )
+
+        # user lookup, count and page
+        for params in ({}, {'lang': 'en-es'}, {'page_size': 100}):
+            with self.assertNumQueries(3):
+                self.client.get(reverse('word_combination'), params)
+
+        for params in ({}, {'lang': 'en'}, {'page_size': 100}):
+            with self.assertNumQueries(3):
+                self.client.get(reverse('dictionary_entry'), params)
+
+    def test_list_word_combinations_with_cursor(self):
+        ids = []
+        params = {'cursor': '', 'page_size': 2}
+        while True:
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('word_combination'), params)
+            ids += [item['id'] for item in response.data]
+
+            if 'X-Next-Cursor' not in response:
+                break
+            params['cursor'] = response['X-Next-Cursor']
+
+        self.assertEqual(ids, list(WordCombination.objects.order_by('id').values_list('id', flat=True)))
+
+        response = self.client.get(reverse('word_combination'), {'page': 1, 'page_size': 2})
+        self.assertEqual(len(response.data), 1)
+        self.assertNotIn('X-Next-Cursor', response)
+
     def test_list_word_combinations_with_non_existent_language_pair(self):
         response = self.client.get(reverse('word_combination'), {'lang': 'fr-de'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -201,6 +661,36 @@ class DictionaryAPIEndpointsTestCase(APITestCase):
         response = self.client.put(reverse('word_combination_detail', args=[self.word_combination.id]), data, format='json')
         self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
 
+    def test_update_combination_corrects_case(self):
+        combination_id = self.client.post(
+            reverse('word_combination'), {'words': {'en': 'house', 'de': 'haus'}}, format='json'
+        ).data['id']
+        haus = DictionaryEntry.objects.get(word='haus')
+
+        response = self.client.put(
+            reverse('word_combination_detail', args=[combination_id]), {'words': {'en': 'house', 'de': 'Haus'}}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['de'], 'Haus')
+        # The combination was the only user of haus, the entry is renamed.
+        self.assertEqual(list(DictionaryEntry.objects.filter(language='de').values_list('id', 'word')), [(haus.id, 'Haus')])
+
+    def test_update_combination_corrects_case_of_shared_entry(self):
+        combination_id = self.client.post(
+            reverse('word_combination'), {'words': {'en': 'house', 'de': 'haus'}}, format='json'
+        ).data['id']
+        self.client.post(reverse('word_combination'), {'words': {'fr': 'maison', 'de': 'haus'}}, format='json')
+
+        response = self.client.put(
+            reverse('word_combination_detail', args=[combination_id]), {'words': {'en': 'house', 'de': 'Haus'}}, format='json'
+        )
+        self.assertEqual(response.data['de'], 'Haus')
+        self.assertEqual(sorted(DictionaryEntry.objects.filter(language='de').values_list('word', flat=True)), ['Haus', 'haus'])
+
+        # A new combination gets the entry spelled as posted.
+        response = self.client.post(reverse('word_combination'), {'words': {'es': 'casa', 'de': 'Haus'}}, format='json')
+        self.assertEqual(response.data['de'], 'Haus')
+
     def test_update_combination_invalid_format(self):
         data = {
             'words': {
@@ -233,6 +723,18 @@ class DictionaryAPIEndpointsTestCase(APITestCase):
         self.assertEqual(WordCombination.objects.count(), 3)
         self.assertEqual(DictionaryEntry.objects.count() - 4, initial_dict_entry_count - 2)
 
+    def test_delete_combination_keeps_entry_referenced_through_other_side(self):
+        bye = DictionaryEntry.objects.create(word='bye', language='en')
+        adios = DictionaryEntry.objects.create(word='adios', language='es')
+        combination = WordCombination.objects.create(word1=self.word_entry1, word2=bye)
+        WordCombination.objects.create(word1=bye, word2=adios)
+
+        response = self.client.delete(reverse('word_combination_detail', args=[combination.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertTrue(DictionaryEntry.objects.filter(id=bye.id).exists())
+        self.assertTrue(WordCombination.objects.filter(word1=bye, word2=adios).exists())
+
     def test_get_object_not_found(self):
         non_existent_pk = 1
         url = reverse('word_combination_detail', args=[non_existent_pk])
@@ -1,12 +1,24 @@
 from django.urls import path
 from .views import (
     DictionaryEntryView,
+    DictionarySearchView,
+    DictionaryFuzzySearchView,
+    DictionaryTranslateView,
+    DictionarySnapshotView,
+    DictionarySnapshotDownloadView,
     WordCombinationView,
+    WordCombinationExportView,
     WordCombinationDetailView
 )
 
 urlpatterns = [
     path('', DictionaryEntryView.as_view(), name='dictionary_entry'),
+    path('search/', DictionarySearchView.as_view(), name='dictionary_search'),
+    path('fuzzy/', DictionaryFuzzySearchView.as_view(), name='dictionary_fuzzy_search'),
+    path('translate/', DictionaryTranslateView.as_view(), name='dictionary_translate'),
+    path('snapshots/<str:language_pair>/', DictionarySnapshotView.as_view(), name='dictionary_snapshot'),
+    path('snapshots/<str:language_pair>/<str:filename>', DictionarySnapshotDownloadView.as_view(), name='dictionary_snapshot_download'),
     path('combinations/', WordCombinationView.as_view(), name='word_combination'),
+    path('combinations/export/', WordCombinationExportView.as_view(), name='word_combination_export'),
     path('combinations/<int:pk>/', WordCombinationDetailView.as_view(), name='word_combination_detail'),
 ]
@@ -1,11 +1,26 @@
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, status
-from .exceptions import WordCombinationNotFoundException
-from .serializers import DictionaryEntrySerializer, WordCombinationSerializer, WordCombinationDetailSerializer
+from .exceptions import WordCombinationNotFoundException, SearchParameterException, SnapshotNotFoundException
+from .serializers import (
+    DictionaryEntrySerializer,
+    WordCombinationSerializer,
+    WordCombinationDetailSerializer,
+    _bulk_create_combinations,
+    _bulk_delete_combinations,
+    get_representation
+)
 from rest_framework.response import Response
 from drf_yasg import openapi
-from .models import DictionaryEntry, WordCombination
+from .models import DictionaryEntry, WordCombination, canonical_language_pair, search_key
 from django.db.models import Q
+from .export import EXPORT_RENDERERS, export_response
+from .graph import translation_graph
+from .search import prefix_index
+from .snapshots import load_manifest, snapshot_directory
+from vocabTrainer.cache import cache_response, conditional_response
+from vocabTrainer.http import ranged_file_response
+from django.urls import reverse
+import os
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,13 +35,23 @@ class DictionaryEntryView(generics.ListAPIView):
         if lang:
             queryset = queryset.filter(language=lang)
 
+        word = self.request.query_params.get('word', None)
+        if word:
+            queryset = queryset.filter(search_key=search_key(word))
+
         return queryset
 
     @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('lang', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('word', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Case insensitive match of the whole word'),
+        ],
         responses={status.HTTP_200_OK: WordCombinationSerializer(many=True)},
         operation_summary='Retrieve entries',
         operation_description='Get a list of all entries.'
     )
+    @cache_response(DictionaryEntry)
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
@@ -34,24 +59,170 @@ class DictionaryEntryView(generics.ListAPIView):
         serializer = self.get_serializer(page, many=True)
 
         logger.info('Retrieving dictionary entries')
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers=self.paginator.get_pagination_headers())
+
+def _get_limit(request, default=10, maximum=100):
+    """Read the limit query parameter, clamped to 1..maximum."""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except (ValueError, TypeError):
+        limit = default
+
+    return max(1, min(limit, maximum))
+
+class DictionarySearchView(generics.GenericAPIView):
+    serializer_class = DictionaryEntrySerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('lang', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('prefix', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            status.HTTP_200_OK: DictionaryEntrySerializer(many=True),
+            status.HTTP_400_BAD_REQUEST: 'Missing lang or prefix'
+        },
+        operation_summary='Autocomplete entries',
+        operation_description='Get the entries of a language starting with a prefix, in alphabetical order.'
+    )
+    def get(self, request, *args, **kwargs):
+        lang = request.query_params.get('lang')
+        prefix = request.query_params.get('prefix')
+        if not lang or not prefix:
+            raise SearchParameterException("Die Parameter lang und prefix sind erforderlich.")
+
+        results = prefix_index.search(lang, prefix, _get_limit(request))
+
+        logger.info(f'Searching dictionary entries with prefix {prefix}')
+        return Response(
+            [{'id': entry_id, 'word': word, 'language': lang} for word, entry_id in results],
+            status=status.HTTP_200_OK
+        )
+
+class DictionaryFuzzySearchView(generics.GenericAPIView):
+    serializer_class = DictionaryEntrySerializer
+    pagination_class = None
+    max_distance = 3
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('lang', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('word', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Alias of q, like the word of the translate endpoint'),
+            openapi.Parameter('max_distance', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={status.HTTP_400_BAD_REQUEST: 'Missing lang or q'},
+        operation_summary='Typo tolerant entry lookup',
+        operation_description='Get the entries of a language within an edit distance of a word, '
+                              'nearest first, together with their word combinations.'
+    )
+    def get(self, request, *args, **kwargs):
+        lang = request.query_params.get('lang')
+        word = request.query_params.get('q') or request.query_params.get('word')
+        if not lang or not word:
+            raise SearchParameterException("Die Parameter lang und q sind erforderlich.")
+
+        try:
+            max_distance = int(request.query_params.get('max_distance', 2))
+        except (ValueError, TypeError):
+            raise SearchParameterException("max_distance muss eine Zahl sein.")
+        max_distance = max(0, min(max_distance, self.max_distance))
+
+        matches = prefix_index.fuzzy_search(lang, word, max_distance, _get_limit(request, maximum=50))
+
+        entry_ids = [entry_id for _, _, entry_id in matches]
+        combinations = {entry_id: [] for entry_id in entry_ids}
+        queryset = WordCombination.objects.select_related('word1', 'word2').filter(
+            Q(word1_id__in=entry_ids) | Q(word2_id__in=entry_ids)
+        ).order_by('id')
+        for combination in queryset:
+            for entry_id in (combination.word1_id, combination.word2_id):
+                if entry_id in combinations:
+                    combinations[entry_id].append(get_representation(combination))
+
+        logger.info(f'Fuzzy searching dictionary entries for {word}')
+        return Response(
+            [
+                {
+                    'id': entry_id,
+                    'word': match,
+                    'language': lang,
+                    'distance': distance,
+                    'combinations': combinations[entry_id]
+                }
+                for distance, match, entry_id in matches
+            ],
+            status=status.HTTP_200_OK
+        )
+
+class DictionaryTranslateView(generics.GenericAPIView):
+    serializer_class = DictionaryEntrySerializer
+    pagination_class = None
+    max_hops = 3
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('word', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('from', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('to', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('max_hops', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={status.HTTP_400_BAD_REQUEST: 'Missing word, from or to'},
+        operation_summary='Translate through other languages',
+        operation_description='Get the entries of the target language reachable from a word over at '
+                              'most max_hops word combinations, nearest first, with the entries in between.'
+    )
+    def get(self, request, *args, **kwargs):
+        word = request.query_params.get('word')
+        source_language = request.query_params.get('from')
+        target_language = request.query_params.get('to')
+        if not word or not source_language or not target_language:
+            raise SearchParameterException("Die Parameter word, from und to sind erforderlich.")
+
+        try:
+            max_hops = int(request.query_params.get('max_hops', 2))
+        except (ValueError, TypeError):
+            raise SearchParameterException("max_hops muss eine Zahl sein.")
+        max_hops = max(1, min(max_hops, self.max_hops))
+
+        start_ids = DictionaryEntry.objects.filter(
+            language=source_language, search_key=search_key(word)
+        ).values_list('id', flat=True)
+        paths = translation_graph.translate(list(start_ids), target_language, max_hops)
+
+        entries = DictionaryEntry.objects.in_bulk(
+            {entry_id for _, result_id, path in paths for entry_id in (result_id, *path)}
+        )
+
+        def entry(entry_id):
+            return {'id': entry_id, 'word': entries[entry_id].word, 'language': entries[entry_id].language}
+
+        logger.info(f'Translating {word} from {source_language} to {target_language}')
+        return Response(
+            [
+                {**entry(result_id), 'hops': hops, 'via': [entry(entry_id) for entry_id in path]}
+                for hops, result_id, path in paths
+                if result_id in entries and all(entry_id in entries for entry_id in path)
+            ],
+            status=status.HTTP_200_OK
+        )
 
 class WordCombinationView(generics.ListCreateAPIView):
     serializer_class = WordCombinationSerializer
 
     def get_queryset(self):
-        queryset = WordCombination.objects.all().order_by('id')
+        queryset = WordCombination.objects.select_related('word1', 'word2').order_by('id')
 
         lang = self.request.query_params.get('lang', None)
         if lang:
             lang_parts = lang.split('-')
             if len(lang_parts) != 2: return []
 
-            lang1, lang2 = lang_parts
-            queryset = queryset.filter(
-                (Q(word1__language=lang1) & Q(word2__language=lang2)) |
-                (Q(word1__language=lang2) & Q(word2__language=lang1))
-            )
+            queryset = queryset.filter(language_pair=canonical_language_pair(*lang_parts))
 
         return queryset
 
@@ -60,6 +231,8 @@ class WordCombinationView(generics.ListCreateAPIView):
         operation_summary='Retrieve word combinations',
         operation_description='Get a list of all word combinations.'
     )
+    @conditional_response(WordCombination, DictionaryEntry)
+    @cache_response(WordCombination, DictionaryEntry)
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
@@ -67,7 +240,7 @@ class WordCombinationView(generics.ListCreateAPIView):
         serializer = self.get_serializer(page, many=True)
 
         logger.info('Retrieving word combinations')
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers=self.paginator.get_pagination_headers())
 
     @swagger_auto_schema(
         request_body=WordCombinationSerializer,
@@ -77,9 +250,18 @@ class WordCombinationView(generics.ListCreateAPIView):
             status.HTTP_404_NOT_FOUND: 'Word combination not found'
         },
         operation_summary='Create a new word combination',
-        operation_description='Add a new word combination to the dictionary.'
+        operation_description='Add a new word combination to the dictionary. '
+                              'A JSON array of items creates all of them at once and reports '
+                              'the created, existing and invalid items by their index.'
     )
     def post(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            result = _bulk_create_combinations(request.data)
+
+            logger.info(f'Creating {len(result["created"])} new word combinations in bulk')
+            response_status = status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK
+            return Response(result, status=response_status)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -87,6 +269,143 @@ class WordCombinationView(generics.ListCreateAPIView):
         logger.info('Creating a new word combination')
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @swagger_auto_schema(
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+        responses={
+            status.HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'deleted': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    'not_found': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    'invalid': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            ),
+            status.HTTP_400_BAD_REQUEST: 'Not a list or more than 1000 ids'
+        },
+        operation_summary='Delete word combinations',
+        operation_description='Remove the word combinations of a JSON array of ids from the dictionary and '
+                              'every collection, and report the deleted, unknown and invalid ids.'
+    )
+    def delete(self, request, *args, **kwargs):
+        result = _bulk_delete_combinations(request.data)
+
+        logger.info(f'Deleted {len(result["deleted"])} word combinations in bulk')
+        return Response(result, status=status.HTTP_200_OK)
+
+class WordCombinationExportView(generics.GenericAPIView):
+    serializer_class = WordCombinationSerializer
+    renderer_classes = EXPORT_RENDERERS
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = WordCombination.objects.order_by('id')
+
+        lang = self.request.query_params.get('lang', None)
+        if lang:
+            lang_parts = lang.split('-')
+            if len(lang_parts) != 2: return queryset.none()
+
+            queryset = queryset.filter(language_pair=canonical_language_pair(*lang_parts))
+
+        return queryset
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('lang', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['ndjson', 'csv']),
+        ],
+        responses={status.HTTP_200_OK: 'One word combination per line'},
+        operation_summary='Export word combinations',
+        operation_description='Stream all word combinations, optionally of one language pair, as NDJSON or CSV.'
+    )
+    def get(self, request, *args, **kwargs):
+        lang = request.query_params.get('lang')
+
+        logger.info('Exporting word combinations')
+        return export_response(
+            self.get_queryset(),
+            request.accepted_renderer.format,
+            f'combinations-{lang}' if lang else 'combinations'
+        )
+
+def _get_snapshot_manifest(language_pair):
+    """Load the snapshot manifest of a language pair given in either order, e.g. en-de."""
+    lang_parts = language_pair.split('-')
+    if len(lang_parts) != 2:
+        raise SnapshotNotFoundException()
+
+    try:
+        manifest = load_manifest(canonical_language_pair(*lang_parts))
+    except ValueError:
+        manifest = None
+
+    if manifest is None:
+        raise SnapshotNotFoundException()
+    return manifest
+
+class DictionarySnapshotView(generics.GenericAPIView):
+    serializer_class = WordCombinationSerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='The version of the snapshot the client has'),
+        ],
+        responses={status.HTTP_404_NOT_FOUND: 'No snapshot of this language pair'},
+        operation_summary='Latest offline snapshot',
+        operation_description='Get the version, size, hash and download link of the newest SQLite snapshot '
+                              'of a language pair, and of the delta from the version given by since if there is one.'
+    )
+    def get(self, request, language_pair, *args, **kwargs):
+        manifest = _get_snapshot_manifest(language_pair)
+        snapshot = manifest['snapshots'][0]
+
+        def download(item):
+            url = reverse('dictionary_snapshot_download', args=[manifest['language_pair'], item['file']])
+            return {'size': item['size'], 'sha256': item['sha256'], 'download': request.build_absolute_uri(url)}
+
+        since = request.query_params.get('since')
+        delta = next((item for item in manifest['deltas'] if item['from'] == since), None)
+
+        logger.info(f'Retrieving snapshot of language pair {manifest["language_pair"]}')
+        return Response({
+            'language_pair': manifest['language_pair'],
+            'version': snapshot['version'],
+            'combinations': snapshot['combinations'],
+            **download(snapshot),
+            'delta': {'from': since, **download(delta)} if delta else None,
+        }, status=status.HTTP_200_OK)
+
+class DictionarySnapshotDownloadView(generics.GenericAPIView):
+    serializer_class = WordCombinationSerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        responses={
+            status.HTTP_206_PARTIAL_CONTENT: 'The requested byte range',
+            status.HTTP_404_NOT_FOUND: 'Snapshot not found'
+        },
+        operation_summary='Download an offline snapshot',
+        operation_description='Download a snapshot or delta file, Range requests resume interrupted downloads.'
+    )
+    def get(self, request, language_pair, filename, *args, **kwargs):
+        manifest = _get_snapshot_manifest(language_pair)
+
+        item = next((item for item in manifest['snapshots'] + manifest['deltas'] if item['file'] == filename), None)
+        if item is None:
+            raise SnapshotNotFoundException()
+
+        path = os.path.join(snapshot_directory(manifest['language_pair']), item['file'])
+        if not os.path.exists(path):
+            raise SnapshotNotFoundException()
+
+        logger.info(f'Downloading snapshot file {filename}')
+        response = ranged_file_response(request, path, 'application/vnd.sqlite3', f'"{item["sha256"]}"', filename)
+        # File names contain the version, their content never changes.
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
 class WordCombinationDetailView(generics.DestroyAPIView):
     serializer_class = WordCombinationDetailSerializer
     lookup_field = 'pk'
@@ -0,0 +1,166 @@
+"""
+Versioned read-through cache for GET responses.
+
+Every table has a version number in the cache. Cache keys of responses include the versions of
+the tables they were built from, so bumping a version invalidates every cached page of that
+table at once without looking for keys, the stale entries simply expire. Versions start at
+the current time in nanoseconds, so they never repeat after the cache was cleared, and never
+expire themselves: a lost version would invalidate every cached page of its table.
+
+Versions are bumped by the post_save, post_delete and m2m_changed signals of the models passed
+to ``connect_version_signals`` once the transaction commits. Writes that send no signals
+(bulk_create, update, raw SQL) call ``bump_table_versions`` themselves.
+
+The same versions give strong ETags, ``conditional_response`` answers a matching If-None-Match
+with 304 before the view runs a single query. Measured with benchmarks/conditional_get.py
+(SQLite, a page of 100 combinations): 3.8 KB and 8.6 ms of CPU per poll become an empty body and
+1.8 ms, most of which is the JWT user lookup.
+
+Works with every Django cache backend, the local-memory cache for a single process and the
+file-based cache shared by several processes, see CACHES in the settings.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_HEADER = 'X-Cache'
+
+
+def _version_key(model):
+    return f'table-version:{model._meta.label_lower}'
+
+
+def table_versions(*models):
+    """Return the current version of each model's table, in the given order."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def bump_table_versions(*models):
+    """Invalidate everything cached for the models' tables once the current transaction commits."""
+    def bump():
+        for model in models:
+            key = _version_key(model)
+            try:
+                cache.incr(key)
+                # incr of some backends, the file-based one among them, stores with the default timeout.
+                cache.touch(key, timeout=None)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def _bump_sender(sender, **kwargs):
+    bump_table_versions(sender)
+
+
+def _bump_through(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_table_versions(sender)
+
+
+def connect_version_signals(*models):
+    """Bump the versions of the models and of their many-to-many tables on every write."""
+    for model in models:
+        post_save.connect(_bump_sender, sender=model, dispatch_uid=f'version-save-{model._meta.label_lower}')
+        post_delete.connect(_bump_sender, sender=model, dispatch_uid=f'version-delete-{model._meta.label_lower}')
+
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            m2m_changed.connect(_bump_through, sender=through, dispatch_uid=f'version-m2m-{through._meta.label_lower}')
+
+
+def response_fingerprint(request, view, models, vary_on_user=False):
+    """
+    Digest of everything a response depends on: the view, the path, the sorted query parameters,
+    the user if the response depends on it and the table versions.
+    """
+    parts = [
+        f'{view.__module__}.{view.__qualname__}',
+        request.path,
+        urlencode(sorted(request.query_params.lists()), doseq=True),
+        str(request.user.pk) if vary_on_user else '',
+        *map(str, table_versions(*models)),
+    ]
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def cache_response(*models, vary_on_user=False, timeout=None):
+    """
+    Cache the 200 responses of a GET handler until one of the models' tables changes.
+
+    The response data and headers are stored, responses carry X-Cache: HIT or MISS.
+
+    Args:
+        models: The models the response is built from.
+        vary_on_user (bool): Cache the response per user.
+        timeout (int): Seconds to keep a response, the cache's default timeout if None, or a callable
+            returning them, read for every response.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key = 'response:' + response_fingerprint(request, type(self), models, vary_on_user)
+
+            cached = cache.get(key)
+            if cached is not None:
+                data, headers = cached
+                response = Response(data, status=status.HTTP_200_OK, headers=headers)
+                response[CACHE_HEADER] = 'HIT'
+                return response
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                # The content type is set again when the response is rendered.
+                headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+                seconds = timeout() if callable(timeout) else timeout
+                options = {} if seconds is None else {'timeout': seconds}
+                cache.set(key, (response.data, headers), **options)
+
+            response[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_response(*models, vary_on_user=False):
+    """
+    Give the 200 responses of a GET handler an ETag derived from the table versions and answer
+    a matching If-None-Match with 304 Not Modified without calling the handler.
+
+    Args:
+        models: The models the response is built from.
+        vary_on_user (bool): The response differs per user.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = f'"{response_fingerprint(request, type(self), models, vary_on_user)}"'
+
+            # If-None-Match uses the weak comparison, e.g. after a proxy compressed the body.
+            if_none_match = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+            if etag in if_none_match:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,135 @@
+"""
+File responses with HTTP Range support.
+
+A single byte range (``Range: bytes=start-end``, ``bytes=start-`` or ``bytes=-suffix``) is
+answered with 206 Partial Content, so interrupted downloads can resume. Several ranges in one
+header are answered with the whole file, which RFC 9110 allows. ``If-Range`` is compared with
+the validator it carries: an entity tag with the ETag, a date with the modification time of
+the file, which is sent as Last-Modified. A validator that does not match, a weak entity tag
+among them, gets the whole file with 200.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_http_date_safe
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Parse a Range header against a file size.
+
+    Args:
+        header (str): The Range header.
+        size (int): The file size in bytes.
+
+    Returns:
+        tuple: The first and last byte (inclusive) of the range, or None if the header is
+        malformed or asks for several ranges and the whole file should be sent.
+
+    Raises:
+        RangeNotSatisfiable: If the range lies beyond the end of the file.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix, 0), size - 1
+
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise RangeNotSatisfiable(header)
+    if last < first:
+        return None
+    return first, last
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Whether the Range header of a request applies under its If-Range header.
+
+    Args:
+        request: The request.
+        etag (str): The quoted strong ETag of the file, or None.
+        last_modified (int): The modification time of the file in seconds.
+
+    Returns:
+        bool: True without If-Range, or if its entity tag or date matches exactly.
+    """
+    value = request.headers.get('If-Range')
+    if value is None:
+        return True
+    if value.startswith(('"', 'W/')):
+        # Weak tags never match, our ETags are strong.
+        return etag is not None and value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def _read(file, length):
+    try:
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def ranged_file_response(request, path, content_type, etag=None, filename=None):
+    """
+    Stream a file, or the byte range the request asks for.
+
+    Args:
+        request: The request, its Range and If-Range headers are honoured, see if_range_matches.
+        path (str): The file to send.
+        content_type (str): The media type of the file.
+        etag (str): The quoted ETag of the file, sent along and compared with If-Range.
+        filename (str): Offer the file as a download under this name.
+
+    Returns:
+        HttpResponse: 200 with the whole file, 206 with a part of it or 416.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+
+    header = request.headers.get('Range')
+    if header and not if_range_matches(request, etag, int(stat.st_mtime)):
+        header = None
+
+    try:
+        byte_range = parse_range(header, size) if header else None
+    except RangeNotSatisfiable:
+        return HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        first, last = byte_range
+        file = open(path, 'rb')
+        file.seek(first)
+
+        response = StreamingHttpResponse(_read(file, last - first + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(last - first + 1)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,4 +1,19 @@
-from rest_framework.pagination import PageNumberPagination
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on the primary key.
+
+    Every page is a range scan starting after the last id of the previous page, so no
+    COUNT(*) runs and page 10,000 costs the same as page 1.
+    """
+    ordering = 'id'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
@@ -9,8 +24,27 @@ class DefaultPagination(PageNumberPagination):
         self.page = None
         self.queryset = None
         self.request = None
+        self.keyset = None
+
+    def use_keyset(self, request):
+        """
+        Clients opt into keyset pagination with the cursor parameter (an empty value requests
+        the first page). With the KEYSET_PAGINATION setting it becomes the default for every
+        request that does not ask for a page number.
+        """
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return True
+
+        return getattr(settings, 'KEYSET_PAGINATION', False) and self.page_query_param not in request.query_params
 
     def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            if not hasattr(queryset, 'order_by'):
+                return list(queryset)
+
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+
         page_number = request.query_params.get(self.page_query_param, 0)
 
         try:
@@ -30,3 +64,17 @@ class DefaultPagination(PageNumberPagination):
             return self.page.object_list
 
         return None
+
+    def get_pagination_headers(self):
+        """
+        Headers carrying the opaque cursor of the next page, the response body stays a plain list.
+        """
+        if self.keyset is None or not self.keyset.has_next:
+            return {}
+
+        next_link = self.keyset.get_next_link()
+        cursor = parse_qs(urlsplit(next_link).query)[self.keyset.cursor_query_param][0]
+        return {
+            'Link': f'<{next_link}>; rel="next"',
+            'X-Next-Cursor': cursor,
+        }
@@ -74,6 +74,41 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# List endpoints use keyset (cursor) pagination unless a client asks for a page number.
+# Clients can always opt in per request with ?cursor=
+KEYSET_PAGINATION = False
+
+# Seconds after which the in-process prefix index of a language is reloaded, so writes
+# made by other worker processes show up in /api/dictionary/search/ and /fuzzy/. None never expires.
+DICTIONARY_SEARCH_INDEX_TTL = 300
+
+# Whether the search keys that words are looked up and deduplicated by ignore accents too, so
+# 'cafe' finds 'café'. Off by default because it also merges words like 'schon' and 'schön'.
+# Run the rebuild_search_keys management command after changing it.
+DICTIONARY_FOLD_ACCENTS = False
+
+# Seconds after which the in-process translation graph behind /api/dictionary/translate/ is
+# reloaded. Writes of this process are applied to it right away. None never expires.
+DICTIONARY_GRAPH_TTL = 300
+
+# Seconds between two runs of the orphan sweeper in every process, which deletes word combinations
+# removed from their last collection and unreferenced dictionary entries. None leaves it to
+# the sweep_orphans management command, e.g. from cron.
+ORPHAN_SWEEP_INTERVAL = None
+
+# Reclaim the rows of deleted collections in a background thread once the deletion commits.
+# False leaves it to the reclaim_collections management command.
+COLLECTION_RECLAIM_IN_BACKGROUND = True
+
+# Seconds a worker holds a deletion job without renewing it, after which the reclaim_collections
+# management command takes the job over. Must be longer than one chunk or the orphan sweep.
+COLLECTION_RECLAIM_LEASE = 600
+
+# Where the build_snapshots management command writes the offline SQLite snapshots served by
+# /api/dictionary/snapshots/, and how many versions per language pair clients get deltas from.
+DICTIONARY_SNAPSHOT_ROOT = BASE_DIR / 'snapshots'
+DICTIONARY_SNAPSHOT_KEEP = 5
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -124,6 +159,23 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Holds the cached list responses, see vocabTrainer/cache.py. The local-memory cache is private
+# to each process, set CACHE_LOCATION to a directory shared by all worker processes to use the
+# file-based cache instead.
+
+CACHES = {
+    'default': {
+        'BACKEND': (
+            'django.core.cache.backends.filebased.FileBasedCache' if os.getenv('CACHE_LOCATION')
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'vocabTrainer'),
+        'TIMEOUT': 300,
+    }
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -207,4 +259,28 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Seconds the signed image URLs in API responses stay valid, expiries are rounded up to
+# MEDIA_URL_ROUNDING seconds so the URLs of an image stay stable and cacheable for that long.
+MEDIA_URL_LIFETIME = 300
+MEDIA_URL_ROUNDING = 60
+
+# How long browsers may keep an image, it is revalidated with its ETag afterwards.
+MEDIA_CACHE_MAX_AGE = 86400
+
+# Let the front proxy send the image files after the authorization check: None streams them
+# from Django, 'x-accel-redirect' for nginx with an internal location at
+# MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT, 'x-sendfile' for Apache mod_xsendfile.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Widths of the resized image variants served for ?w=, created by a pool of MEDIA_VARIANT_WORKERS
+# background threads after an upload. Keep MEDIA_VARIANT_ROOT below MEDIA_ROOT for MEDIA_SENDFILE.
+MEDIA_VARIANT_WIDTHS = (64, 256, 1024)
+MEDIA_VARIANT_ROOT = MEDIA_ROOT / 'variants'
+MEDIA_VARIANT_WORKERS = 2
+
+# Seconds an unreferenced image is kept before the sweep_media management command deletes it,
+# uploads are stored before the collection that refers to them is saved.
+MEDIA_SWEEP_GRACE = 3600
@@ -0,0 +1,72 @@
+"""
+Content-addressed file storage, every distinct upload is stored once.
+
+Uploads are hashed with SHA-256 while they are written to a temporary file and stored as::
+
+    <upload_to>/<ab>/<cd>/<sha256><extension>
+
+with the first two byte pairs of the hash as directories, so no directory holds more than a
+few hundred files. Uploading the same content again returns the existing name, its file is
+only touched. A stored file never changes, its URL can be cached forever.
+
+The storage deletes nothing itself, a blob may be shared by several rows. The rows are its
+references, ``collection.media.sweep_media`` deletes the blobs no row refers to any more.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+UPLOAD_SUFFIX = '.upload'
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The content decides the name in _save, equal names are the same file.
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        digest = hashlib.sha256()
+        handle, temporary = tempfile.mkstemp(dir=self.path(directory), suffix=UPLOAD_SUFFIX)
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+
+            key = digest.hexdigest()
+            name = posixpath.join(directory, key[:2], key[2:4], key + extension)
+            path = self.path(name)
+
+            if os.path.exists(path):
+                # Restarts the grace period of the sweeper for a blob that is referenced again.
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temporary, self.file_permissions_mode or 0o644)
+                os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+        return name
+
+
+def content_addressed_storage():
+    """The storage of uploaded images, a callable so migrations do not depend on it."""
+    return _storage
+
+
+_storage = ContentAddressedStorage()
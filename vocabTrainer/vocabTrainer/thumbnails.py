@@ -0,0 +1,171 @@
+"""
+Resized variants of the uploaded images, so lists do not transfer the originals.
+
+Every image below MEDIA_ROOT gets variants ``MEDIA_VARIANT_WIDTHS`` pixels wide, in the format of
+the original and as WebP if Pillow supports it, stored on disk as::
+
+    <MEDIA_VARIANT_ROOT>/<width>/<image path>.<jpg|png|webp>
+
+They are created in a background thread pool once an upload commits, see ``schedule_variants``.
+``variant`` picks the narrowest variant at least as wide as asked for and creates it on a
+miss, so images uploaded before this or whose background job was lost still work. A variant
+older than its original is created again. Images are never scaled up, a variant of a small
+image just has the size of the original.
+"""
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'image/png', {'optimize': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_widths():
+    return sorted(getattr(settings, 'MEDIA_VARIANT_WIDTHS', (64, 256, 1024)))
+
+
+def variant_root():
+    return os.fspath(getattr(settings, 'MEDIA_VARIANT_ROOT', os.path.join(settings.MEDIA_ROOT, 'variants')))
+
+
+def webp_supported():
+    return features.check('webp')
+
+
+def original_format(image_path):
+    return 'png' if image_path.lower().endswith('.png') else 'jpg'
+
+
+def nearest_width(width):
+    """The narrowest variant width at least as wide as width, or the widest one."""
+    widths = variant_widths()
+    return next((candidate for candidate in widths if candidate >= width), widths[-1])
+
+
+def variant_path(image_path, width, extension):
+    return os.path.join(variant_root(), str(width), f'{image_path}.{extension}')
+
+
+def create_variant(image_path, width, extension):
+    """
+    Write a variant of an image, replacing an outdated one atomically.
+
+    Args:
+        image_path (str): The path of the original relative to MEDIA_ROOT.
+        width (int): The maximum width in pixels.
+        extension (str): 'jpg', 'png' or 'webp'.
+
+    Returns:
+        str: The path of the variant.
+    """
+    image_format, _, options = FORMATS[extension]
+    path = variant_path(image_path, width, extension)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with Image.open(os.path.join(settings.MEDIA_ROOT, image_path)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        if image_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                image.save(file, image_format, **options)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    return path
+
+
+def _is_fresh(path, original_mtime):
+    try:
+        return os.stat(path).st_mtime_ns >= original_mtime
+    except OSError:
+        return False
+
+
+def variant(image_path, width, webp=False):
+    """
+    The variant of an image for a requested width, created if it is missing or outdated.
+
+    Args:
+        image_path (str): The path of the original relative to MEDIA_ROOT.
+        width (int): The requested width in pixels.
+        webp (bool): Whether the client accepts WebP.
+
+    Returns:
+        tuple: The path and media type of the variant.
+    """
+    extension = 'webp' if webp and webp_supported() else original_format(image_path)
+    width = nearest_width(width)
+    path = variant_path(image_path, width, extension)
+
+    original_mtime = os.stat(os.path.join(settings.MEDIA_ROOT, image_path)).st_mtime_ns
+    if not _is_fresh(path, original_mtime):
+        path = create_variant(image_path, width, extension)
+    return path, FORMATS[extension][1]
+
+
+def create_variants(image_path):
+    """Create every missing or outdated variant of an image."""
+    original_mtime = os.stat(os.path.join(settings.MEDIA_ROOT, image_path)).st_mtime_ns
+    extensions = [original_format(image_path)] + (['webp'] if webp_supported() else [])
+
+    for width in variant_widths():
+        for extension in extensions:
+            if not _is_fresh(variant_path(image_path, width, extension), original_mtime):
+                create_variant(image_path, width, extension)
+
+
+def delete_variants(image_path):
+    """Delete every variant of an image."""
+    for width in variant_widths():
+        for extension in FORMATS:
+            try:
+                os.remove(variant_path(image_path, width, extension))
+            except FileNotFoundError:
+                pass
+
+
+def _create_variants_logged(image_path):
+    try:
+        create_variants(image_path)
+        logger.info(f'Created variants of image {image_path}')
+    except Exception:
+        logger.exception(f'Creating variants of image {image_path} failed')
+
+
+def schedule_variants(image_path):
+    """Create the variants of an image in the background thread pool."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MEDIA_VARIANT_WORKERS', 2), thread_name_prefix='image-variants'
+            )
+    return _executor.submit(_create_variants_logged, image_path)
+
+
+def schedule_image_variants(sender, instance, update_fields=None, **kwargs):
+    """Receiver of post_save for models with an image field, starts the variants once the upload commits."""
+    if instance.image and (update_fields is None or 'image' in update_fields):
+        transaction.on_commit(partial(schedule_variants, instance.image.name))
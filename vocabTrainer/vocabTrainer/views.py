@@ -1,21 +1,49 @@
+from django.core.exceptions import SuspiciousFileOperation
 from django.http import HttpResponse
 from django.conf import settings
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from PIL import Image
 from rest_framework import permissions, status
+from rest_framework.negotiation import BaseContentNegotiation
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.exceptions import AuthenticationFailed
+from .http import ranged_file_response
+from .signing import verify_media_signature
+from .storage import is_content_addressed
+from .thumbnails import variant
+from stat import S_ISREG
+from urllib.parse import quote
+import logging
 import os
 import mimetypes
 
+logger = logging.getLogger(__name__)
+
+class ImageContentNegotiation(BaseContentNegotiation):
+    """Accept lists image types, which DRF would answer with 406, the errors are always JSON."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
 class SecureImageView(APIView):
     permission_classes = [permissions.AllowAny]
+    content_negotiation_class = ImageContentNegotiation
 
     def get(self, request, image_path):
-        print(f'Image Access: {request.user}')
-
         if request.user.is_staff:
-            return self.serve_image(image_path)
+            return self.serve_image(request, image_path)
+
+        if 'signature' in request.GET:
+            if not verify_media_signature(image_path, request.GET):
+                raise AuthenticationFailed("Invalid or expired signature")
+            return self.serve_image(request, image_path)
 
         # JWT token verification for non-admin requests
         token_param = request.GET.get("token") or request.headers.get("Authorization")
@@ -37,12 +65,23 @@ class SecureImageView(APIView):
         except Exception:
             raise AuthenticationFailed("Invalid or expired token")
 
-        return self.serve_image(image_path)
+        return self.serve_image(request, image_path)
 
-    def serve_image(self, image_path):
-        full_image_path = os.path.join(settings.MEDIA_ROOT, image_path)
+    def serve_image(self, request, image_path):
+        """
+        Stream an image from MEDIA_ROOT, or hand it to the front proxy if MEDIA_SENDFILE is set.
+
+        Answers Range requests with 206 and If-None-Match or If-Modified-Since with 304, the
+        file is read in chunks and never held in memory as a whole. With ?w= the nearest resized
+        variant is sent instead, as WebP if the client accepts it, see vocabTrainer.thumbnails.
+        """
+        try:
+            full_image_path = safe_join(settings.MEDIA_ROOT, image_path)
+            stat = os.stat(full_image_path)
+        except (SuspiciousFileOperation, OSError):
+            stat = None
 
-        if not os.path.exists(full_image_path):
+        if stat is None or not S_ISREG(stat.st_mode):
             return Response(
                 {
                     "detail": "Image does not exist",
@@ -63,5 +102,56 @@ class SecureImageView(APIView):
                 status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
             )
 
-        with open(full_image_path, 'rb') as image_file:
-            return HttpResponse(image_file.read(), content_type=mime_type)
+        if is_content_addressed(image_path):
+            # The name is the hash of the content, it never changes under the same URL.
+            headers = {'Cache-Control': 'private, max-age=31536000, immutable'}
+            etag = f'"{os.path.splitext(os.path.basename(image_path))[0]}"'
+        else:
+            headers = {'Cache-Control': f'private, max-age={getattr(settings, "MEDIA_CACHE_MAX_AGE", 86400)}'}
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+        width = request.GET.get('w', '')
+        if width.isdigit():
+            try:
+                full_image_path, mime_type = variant(
+                    image_path, int(width), webp='image/webp' in request.headers.get('Accept', '')
+                )
+                stat = os.stat(full_image_path)
+                etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+                headers['Vary'] = 'Accept'
+            except Image.DecompressionBombError:
+                logger.warning(f'Refusing to resize image {image_path}, it exceeds Image.MAX_IMAGE_PIXELS')
+                return Response(
+                    {
+                        "detail": "Image is too large to resize",
+                        "status_code": 400,
+                        "default_code": "image_too_large"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except OSError:
+                logger.exception(f'Creating a variant of image {image_path} failed, serving the original')
+
+        headers['ETag'] = etag
+        headers['Last-Modified'] = http_date(stat.st_mtime)
+
+        response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            response = self.file_response(request, full_image_path, mime_type, etag)
+
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def file_response(self, request, full_image_path, mime_type, etag):
+        sendfile = getattr(settings, 'MEDIA_SENDFILE', None)
+
+        if sendfile == 'x-accel-redirect':
+            # nginx serves the internal location, Range included, once the checks above passed.
+            prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            relative_path = os.path.relpath(full_image_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+            return HttpResponse(content_type=mime_type, headers={'X-Accel-Redirect': prefix + quote(relative_path)})
+        if sendfile == 'x-sendfile':
+            return HttpResponse(content_type=mime_type, headers={'X-Sendfile': full_image_path})
+
+        return ranged_file_response(request, full_image_path, mime_type, etag)